@@ -0,0 +1,77 @@
+# admin_ops.py
+# Household-scoped bulk admin operations. Each one is a handful of set-based UPDATE statements
+# in the caller's transaction, so the cost does not depend on how many rows a member owns.
+from sqlalchemy import select, update
+from extensions import db
+from models import User, Expense, Split
+import analytics
+import archive
+import changelog
+
+
+class InvalidTransfer(ValueError):
+    pass
+
+
+def transfer_member(household_id, from_user_id, to_user_id):
+    """Reassign from_user's payments and shares within the household to to_user.
+
+    Returns {"expenses": n, "splits": m} affected-row counts. Does not commit.
+    """
+    if from_user_id == to_user_id:
+        return {"expenses": 0, "splits": 0}
+    changelog.log_member_expenses(household_id, from_user_id)
+    expenses = db.session.execute(
+        update(Expense)
+        .where(Expense.household_id == household_id, Expense.payer_id == from_user_id)
+        .values(payer_id=to_user_id)
+        .execution_options(synchronize_session=False))
+    splits = db.session.execute(
+        update(Split)
+        .where(Split.user_id == from_user_id,
+               Split.expense_id.in_(select(Expense.id).where(Expense.household_id == household_id)))
+        .values(user_id=to_user_id)
+        .execution_options(synchronize_session=False))
+    analytics.transfer_payer(household_id, from_user_id, to_user_id)
+    archive.reassign_member(household_id, from_user_id, to_user_id)
+    return {"expenses": expenses.rowcount, "splits": splits.rowcount}
+
+def deactivate_members(household_id, user_ids):
+    """Soft-delete members of the household. Returns the number of users deactivated. Does not commit."""
+    if not user_ids:
+        return 0
+    for uid in user_ids:
+        changelog.log_member_expenses(household_id, uid)
+    result = db.session.execute(
+        update(User)
+        .where(User.household_id == household_id, User.id.in_(user_ids), User.is_active.is_(True))
+        .values(is_active=False)
+        .execution_options(synchronize_session=False))
+    return result.rowcount
+
+def validate_batch(household_id, transfers, deactivate, acting_user_id):
+    """Check a batch request against the household's members. Raises InvalidTransfer."""
+    members = {u.id: u for u in User.query.filter_by(household_id=household_id).all()}
+    sources = [t["from_user_id"] for t in transfers]
+    targets = {t["to_user_id"] for t in transfers}
+    for uid in sources + list(targets) + list(deactivate):
+        if uid not in members:
+            raise InvalidTransfer(f"user {uid} is not in this household")
+    if len(set(sources)) != len(sources):
+        raise InvalidTransfer("a member can only be transferred once per batch")
+    if targets & set(sources) or targets & set(deactivate):
+        raise InvalidTransfer("cannot transfer to a member who is being removed")
+    if acting_user_id in sources or acting_user_id in deactivate:
+        raise InvalidTransfer("cannot remove yourself")
+    for uid in targets:
+        if not members[uid].is_active:
+            raise InvalidTransfer(f"user {uid} is inactive")
+
+def transfer_batch(household_id, transfers, deactivate=()):
+    """Apply several transfers (each source is also deactivated) plus extra deactivations. Does not commit."""
+    results = []
+    for t in transfers:
+        counts = transfer_member(household_id, t["from_user_id"], t["to_user_id"])
+        results.append(dict(t, **counts))
+    removed = deactivate_members(household_id, sorted({t["from_user_id"] for t in transfers} | set(deactivate)))
+    return {"transfers": results, "deactivated": removed}
@@ -0,0 +1,152 @@
+# aggregates.py
+# Per-household and per-household-per-day spend totals, maintained incrementally by the
+# expense write paths so dashboard/budget reads never scan the Expense table.
+from collections import defaultdict
+from sqlalchemy import case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db
+from models import Expense, HouseholdTotal, HouseholdDailyTotal
+import archive
+
+TOLERANCE = 0.005
+
+
+def _upsert(model, keys, rows):
+    stmt = sqlite_insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={"total": model.total + stmt.excluded.total,
+              "expense_count": model.expense_count + stmt.excluded.expense_count})
+    db.session.execute(stmt, rows)
+
+def record_expenses(expenses):
+    """Add newly inserted expenses to the aggregates. Call before the write is committed.
+
+    expenses is an iterable of objects or dicts with household_id, date and amount.
+    """
+    daily = defaultdict(lambda: [0.0, 0])
+    for e in expenses:
+        if isinstance(e, dict):
+            hid, day, amount = e["household_id"], e["date"], e["amount"]
+        else:
+            hid, day, amount = e.household_id, e.date, e.amount
+        acc = daily[(hid, day)]
+        acc[0] += float(amount or 0)
+        acc[1] += 1
+    if not daily:
+        return
+    households = defaultdict(lambda: [0.0, 0])
+    for (hid, _), (total, count) in daily.items():
+        households[hid][0] += total
+        households[hid][1] += count
+    _upsert(HouseholdDailyTotal, ["household_id", "day"],
+            [{"household_id": hid, "day": day, "total": t, "expense_count": n} for (hid, day), (t, n) in daily.items()])
+    _upsert(HouseholdTotal, ["household_id"],
+            [{"household_id": hid, "total": t, "expense_count": n} for hid, (t, n) in households.items()])
+
+
+# ---------- reads ----------
+def household_total(household_id):
+    """All-time spend for a household: one primary-key lookup."""
+    row = db.session.get(HouseholdTotal, household_id)
+    return row.total if row else 0.0
+
+def range_total(household_id, start=None, end=None):
+    """Spend between start and end (inclusive dates): a range scan over at most one row per day."""
+    if start is None and end is None:
+        return household_total(household_id)
+    q = db.session.query(func.coalesce(func.sum(HouseholdDailyTotal.total), 0.0)).filter(
+        HouseholdDailyTotal.household_id == household_id)
+    if start is not None:
+        q = q.filter(HouseholdDailyTotal.day >= start)
+    if end is not None:
+        q = q.filter(HouseholdDailyTotal.day <= end)
+    return float(q.scalar())
+
+def window_totals(household_id, windows):
+    """Spend for each (start, end) window, all answered by one range scan over the days they span.
+
+    Cost depends on how many days the windows cover, not on how long the history is.
+    """
+    if not windows:
+        return []
+    day = HouseholdDailyTotal.day
+    cols = [func.coalesce(func.sum(case((day.between(start, end), HouseholdDailyTotal.total), else_=0.0)), 0.0)
+            for start, end in windows]
+    row = db.session.query(*cols).filter(HouseholdDailyTotal.household_id == household_id,
+                                         day >= min(s for s, _ in windows),
+                                         day <= max(e for _, e in windows)).one()
+    return [float(v) for v in row]
+
+
+# ---------- rebuild / verify ----------
+def _raw_daily(household_id=None):
+    """(household_id, day, total, count) from the hot rows plus archived snapshots."""
+    q = db.session.query(Expense.household_id, Expense.date, func.sum(Expense.amount), func.count(Expense.id)).filter(
+        Expense.household_id.isnot(None), Expense.date.isnot(None))
+    if household_id is not None:
+        q = q.filter(Expense.household_id == household_id)
+    acc = defaultdict(lambda: [0.0, 0])
+    for hid, day, total, n in q.group_by(Expense.household_id, Expense.date).all():
+        acc[(hid, day)][0] += float(total or 0)
+        acc[(hid, day)][1] += n
+    for (hid, day, _, _), (total, n) in archive.rollup_rows(household_id).items():
+        acc[(hid, day)][0] += total
+        acc[(hid, day)][1] += n
+    return [(hid, day, total, n) for (hid, day), (total, n) in acc.items()]
+
+def rebuild(household_id=None):
+    """Recompute the aggregates from the raw Expense rows (all households by default) and commit."""
+    for model in (HouseholdDailyTotal, HouseholdTotal):
+        q = model.query
+        if household_id is not None:
+            q = q.filter(model.household_id == household_id)
+        q.delete(synchronize_session=False)
+    daily = _raw_daily(household_id)
+    if daily:
+        db.session.execute(sqlite_insert(HouseholdDailyTotal), [
+            {"household_id": hid, "day": day, "total": float(total or 0), "expense_count": n}
+            for hid, day, total, n in daily])
+        households = {}
+        for hid, _, total, n in daily:
+            t, c = households.get(hid, (0.0, 0))
+            households[hid] = (t + float(total or 0), c + n)
+        db.session.execute(sqlite_insert(HouseholdTotal), [
+            {"household_id": hid, "total": t, "expense_count": n} for hid, (t, n) in households.items()])
+    db.session.commit()
+    return len(daily)
+
+def verify(household_id=None):
+    """Compare the maintained aggregates with the raw rows. Returns a list of mismatch descriptions."""
+    problems = []
+    raw = {(hid, day): (float(total or 0), n) for hid, day, total, n in _raw_daily(household_id)}
+    q = HouseholdDailyTotal.query
+    if household_id is not None:
+        q = q.filter(HouseholdDailyTotal.household_id == household_id)
+    kept = {(r.household_id, r.day): (r.total, r.expense_count) for r in q.all()}
+    for key in set(raw) | set(kept):
+        want = raw.get(key, (0.0, 0))
+        have = kept.get(key, (0.0, 0))
+        if abs(want[0] - have[0]) > TOLERANCE or want[1] != have[1]:
+            problems.append(f"household {key[0]} day {key[1]}: expected {want}, stored {have}")
+
+    raw_hh = {}
+    for (hid, _), (t, n) in raw.items():
+        rt, rn = raw_hh.get(hid, (0.0, 0))
+        raw_hh[hid] = (rt + t, rn + n)
+    q = HouseholdTotal.query
+    if household_id is not None:
+        q = q.filter(HouseholdTotal.household_id == household_id)
+    kept_hh = {r.household_id: (r.total, r.expense_count) for r in q.all()}
+    for hid in set(raw_hh) | set(kept_hh):
+        want = raw_hh.get(hid, (0.0, 0))
+        have = kept_hh.get(hid, (0.0, 0))
+        if abs(want[0] - have[0]) > TOLERANCE or want[1] != have[1]:
+            problems.append(f"household {hid}: expected {want}, stored {have}")
+    return problems
+
+def ensure_built():
+    """Populate the aggregates once for databases that predate them."""
+    if db.session.query(HouseholdTotal.household_id).first() is None and \
+            db.session.query(Expense.id).first() is not None:
+        rebuild()
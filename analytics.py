@@ -0,0 +1,137 @@
+# analytics.py
+# Spend by category, member and day/week/month, answered from the ExpenseRollup table instead of
+# the raw Expense rows. Write paths keep the rollup current; rebuild()/verify() recompute it.
+from collections import defaultdict
+from sqlalchemy import func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db
+from models import User, Expense, ExpenseRollup
+import archive
+
+GROUPINGS = ("category", "member", "day", "week", "month")
+TOLERANCE = 0.005
+
+
+def _key(e):
+    if isinstance(e, dict):
+        return (e["household_id"], e["date"], e.get("category") or "", e["payer_id"]), float(e["amount"] or 0)
+    return (e.household_id, e.date, e.category or "", e.payer_id), float(e.amount or 0)
+
+def record_expenses(expenses):
+    """Add newly inserted expenses to the rollup. Call before the write is committed."""
+    acc = defaultdict(lambda: [0.0, 0])
+    for e in expenses:
+        key, amount = _key(e)
+        acc[key][0] += amount
+        acc[key][1] += 1
+    if not acc:
+        return
+    stmt = sqlite_insert(ExpenseRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["household_id", "day", "category", "payer_id"],
+        set_={"total": ExpenseRollup.total + stmt.excluded.total,
+              "expense_count": ExpenseRollup.expense_count + stmt.excluded.expense_count})
+    db.session.execute(stmt, [{"household_id": h, "day": d, "category": c, "payer_id": p, "total": t, "expense_count": n}
+                              for (h, d, c, p), (t, n) in acc.items()])
+
+def transfer_payer(household_id, from_user_id, to_user_id):
+    """Move from_user's rollup rows onto to_user, merging with rows that already exist."""
+    if from_user_id == to_user_id:
+        return  # the merge would double the rows and the delete would then drop them
+    params = {"hid": household_id, "src": from_user_id, "dst": to_user_id}
+    db.session.execute(text(
+        "INSERT INTO expense_rollup (household_id, day, category, payer_id, total, expense_count) "
+        "SELECT household_id, day, category, :dst, total, expense_count FROM expense_rollup "
+        "WHERE household_id = :hid AND payer_id = :src "
+        "ON CONFLICT (household_id, day, category, payer_id) DO UPDATE SET "
+        "total = total + excluded.total, expense_count = expense_count + excluded.expense_count"), params)
+    db.session.execute(text("DELETE FROM expense_rollup WHERE household_id = :hid AND payer_id = :src"), params)
+
+
+# ---------- reads ----------
+def _bucket(group):
+    if group == "category":
+        return ExpenseRollup.category
+    if group == "member":
+        return ExpenseRollup.payer_id
+    if group == "day":
+        return ExpenseRollup.day
+    if group == "week":
+        return func.strftime("%Y-W%W", ExpenseRollup.day)
+    if group == "month":
+        return func.strftime("%Y-%m", ExpenseRollup.day)
+    raise ValueError(f"unknown grouping {group!r}")
+
+def spend_by(household_id, group, start=None, end=None):
+    """[{"key", "total", "count"}] for one grouping over an optional inclusive date range."""
+    bucket = _bucket(group).label("bucket")
+    q = db.session.query(bucket, func.sum(ExpenseRollup.total), func.sum(ExpenseRollup.expense_count)).filter(
+        ExpenseRollup.household_id == household_id)
+    if start:
+        q = q.filter(ExpenseRollup.day >= start)
+    if end:
+        q = q.filter(ExpenseRollup.day <= end)
+    rows = q.group_by(bucket).order_by(bucket).all()
+
+    if group == "member":
+        users = {u.id: u for u in User.query.filter(User.id.in_([r[0] for r in rows])).all()} if rows else {}
+        out = []
+        for uid, total, count in rows:
+            u = users.get(uid)
+            out.append({"key": uid, "display_name": (u.display_name or u.email) if u else "Unknown User",
+                        "total": round(total, 2), "count": count})
+        return sorted(out, key=lambda r: -r["total"])
+    return [{"key": k.isoformat() if hasattr(k, "isoformat") else (k or None), "total": round(total, 2), "count": count}
+            for k, total, count in rows]
+
+
+# ---------- rebuild / verify ----------
+def _raw(household_id=None):
+    """(household_id, day, category, payer_id, total, count) from the hot rows plus archived snapshots."""
+    cat = func.coalesce(Expense.category, "")
+    q = db.session.query(Expense.household_id, Expense.date, cat, Expense.payer_id,
+                         func.sum(Expense.amount), func.count(Expense.id)).filter(
+        Expense.household_id.isnot(None), Expense.date.isnot(None))
+    if household_id is not None:
+        q = q.filter(Expense.household_id == household_id)
+    acc = archive.rollup_rows(household_id)
+    for h, d, c, p, t, n in q.group_by(Expense.household_id, Expense.date, cat, Expense.payer_id).all():
+        acc[(h, d, c, p)][0] += float(t or 0)
+        acc[(h, d, c, p)][1] += n
+    return [(h, d, c, p, t, n) for (h, d, c, p), (t, n) in acc.items()]
+
+def rebuild(household_id=None):
+    """Recompute the rollup from raw Expense rows and commit. Returns the number of rollup rows."""
+    q = ExpenseRollup.query
+    if household_id is not None:
+        q = q.filter(ExpenseRollup.household_id == household_id)
+    q.delete(synchronize_session=False)
+    rows = _raw(household_id)
+    if rows:
+        db.session.execute(sqlite_insert(ExpenseRollup), [
+            {"household_id": h, "day": d, "category": c, "payer_id": p, "total": float(t or 0), "expense_count": n}
+            for h, d, c, p, t, n in rows])
+    db.session.commit()
+    return len(rows)
+
+def verify(household_id=None):
+    """Compare the rollup with the raw rows. Returns a list of mismatch descriptions."""
+    raw = {(h, d, c, p): (float(t or 0), n) for h, d, c, p, t, n in _raw(household_id)}
+    q = ExpenseRollup.query
+    if household_id is not None:
+        q = q.filter(ExpenseRollup.household_id == household_id)
+    kept = {(r.household_id, r.day, r.category, r.payer_id): (r.total, r.expense_count) for r in q.all()}
+    problems = []
+    for key in set(raw) | set(kept):
+        want = raw.get(key, (0.0, 0))
+        have = kept.get(key, (0.0, 0))
+        if abs(want[0] - have[0]) > TOLERANCE or want[1] != have[1]:
+            problems.append(f"household {key[0]} day {key[1]} category {key[2]!r} payer {key[3]}: "
+                            f"expected {want}, stored {have}")
+    return problems
+
+def ensure_built():
+    """Populate the rollup once for databases that predate it."""
+    if db.session.query(ExpenseRollup.household_id).first() is None and \
+            db.session.query(Expense.id).first() is not None:
+        rebuild()
@@ -1,63 +1,205 @@
+import math
 import os
-from flask import Flask, render_template, redirect, url_for, request, jsonify, send_file
+import threading
+from flask import Blueprint, Flask, current_app, render_template, redirect, url_for, request, jsonify, send_file, Response, stream_with_context
 from flask_login import LoginManager, current_user, login_required, login_user
-from extensions import db
-from models import User, Household, Expense, Split
+from extensions import db, configure_sqlite, init_sqlite, with_write_retry
+import admin_ops
+import aggregates
+import analytics
+import archive
+import changelog
+import identity_cache
+import importer
+import metrics
+import migrations
+import reports
+import search
+import settlement
+import report_jobs
+import versions
+from models import User, Household, Expense, Split, ReportJob
 from auth import auth_bp, make_google_bp
+from routes.budget import budget_bp
+from queries import (load_expenses, load_page, iter_expense_dicts, newest_first,
+                     decode_cursor, expense_to_dict, PAGE_SIZE, MAX_PAGE_SIZE)
 from datetime import datetime, date
-import pandas as pd
-import os
-from keep_alive import run_keep_alive
-# Check if we are running on Render and start the keep_alive thread
-if os.environ.get('RENDER'):  # Render sets this environment variable to 'true'
-    run_keep_alive()
-    print("Keep-alive thread started for Render deployment.")
+import json
+import click
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(APP_DIR, "data")
-REPORTS_DIR = os.path.join(APP_DIR, "reports")
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(REPORTS_DIR, exist_ok=True)
-
-app = Flask(__name__, template_folder="templates", static_folder="static")
-app.secret_key = os.environ.get("FLASK_SECRET_KEY", "change-me-locally")
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(DATA_DIR, "expenses.db")
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+DATA_DIR = os.environ.get("DATA_DIR") or os.path.join(APP_DIR, "data")
+REPORTS_DIR = os.environ.get("REPORTS_DIR") or os.path.join(APP_DIR, "reports")
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
-db.init_app(app)
+main_bp = Blueprint("main", __name__, cli_group=None)
 
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
-login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(uid):
-    return db.session.get(User, int(uid))
+    return identity_cache.get_user(int(uid))
+
+
+# ---------- app factory ----------
+# Import and create_app() only do cheap, in-memory setup so a cold worker can answer /healthz
+# right away. Schema checks and the keep-alive thread wait for the first real request.
+def create_app():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    app = Flask(__name__, template_folder="templates", static_folder="static")
+    app.secret_key = os.environ.get("FLASK_SECRET_KEY", "change-me-locally")
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(DATA_DIR, "expenses.db")
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SCHEMA_MARKER"] = os.path.join(DATA_DIR, ".schema_ok")
+    app.config["ARCHIVE_DIR"] = os.environ.get("ARCHIVE_DIR") or os.path.join(DATA_DIR, "archive")
+    app.config["REPORT_CACHE_DIR"] = os.path.join(REPORTS_DIR, "cache")
+    app.config["REPORT_CACHE_MAX_BYTES"] = int(os.environ.get("REPORT_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+    app.config["REPORT_CACHE_MAX_AGE"] = int(os.environ.get("REPORT_CACHE_MAX_AGE", 7 * 24 * 3600))
+    app.config["SEARCH_RANK_WINDOW"] = int(os.environ.get("SEARCH_RANK_WINDOW", search.RANK_WINDOW))
+
+    configure_sqlite(app)
+    db.init_app(app)
+    init_sqlite(app)
+    metrics.init_app(app)
+    report_jobs.init_app(app)
+    identity_cache.init_app(app, DATA_DIR)
+    login_manager.init_app(app)
+
+    app.register_blueprint(auth_bp, url_prefix="/auth")
+    # Google blueprint only when configured; flask_dance is imported inside make_google_bp
+    google_bp = make_google_bp()
+    if google_bp:
+        app.register_blueprint(google_bp, url_prefix="/login")
+    app.register_blueprint(main_bp)
+    app.register_blueprint(budget_bp, url_prefix="/api")
+
+    app.add_url_rule("/healthz", "healthz", healthz)
+    app.before_request(_warm_up)
+    return app
+
+def healthz():
+    return {"status": "ok"}
+
+_warm_lock = threading.Lock()
+_warm = False
+
+def _warm_up():
+    """Once per process, before the first request that is not /healthz or a static file."""
+    global _warm
+    if _warm or request.endpoint in ("healthz", "static"):
+        return
+    with _warm_lock:
+        if _warm:
+            return
+        migrations.ensure_schema()
+        # Render sets this environment variable to 'true'
+        if os.environ.get("RENDER"):
+            from keep_alive import run_keep_alive
+            run_keep_alive()
+            print("Keep-alive thread started for Render deployment.")
+        _warm = True
 
-# Register auth blueprint
-app.register_blueprint(auth_bp, url_prefix="/auth")
-# Register Google blueprint if configured
-google_bp = make_google_bp()
-if google_bp:
-    app.register_blueprint(google_bp, url_prefix="/login")
 
-with app.app_context():
-    db.create_all()
+@main_bp.cli.command("db-upgrade")
+def db_upgrade_command():
+    """Create missing tables and apply pending schema migrations."""
+    applied = migrations.ensure_schema(force=True)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+
+@main_bp.cli.command("explain-queries")
+def explain_queries_command():
+    """Show EXPLAIN QUERY PLAN for the hot queries and check each uses its index."""
+    failed = 0
+    for name, index, plan, ok in migrations.explain_hot_queries():
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<20} {plan}")
+        failed += not ok
+    if failed:
+        raise SystemExit(1)
+
+@main_bp.cli.command("rebuild-analytics")
+def rebuild_analytics_command():
+    """Recompute the category/member/day spend rollup from the raw expense rows."""
+    rows = analytics.rebuild()
+    print(f"Rebuilt analytics rollup ({rows} rows).")
+
+@main_bp.cli.command("verify-analytics")
+def verify_analytics_command():
+    """Check the spend rollup against the raw expense rows."""
+    problems = analytics.verify()
+    for p in problems:
+        print(p)
+    print("Analytics rollup OK." if not problems else f"{len(problems)} mismatches found.")
+    if problems:
+        raise SystemExit(1)
+
+@main_bp.cli.command("rebuild-aggregates")
+def rebuild_aggregates_command():
+    """Recompute household spend aggregates from the raw expense rows."""
+    days = aggregates.rebuild()
+    print(f"Rebuilt aggregates ({days} household-days).")
+
+@main_bp.cli.command("verify-aggregates")
+def verify_aggregates_command():
+    """Check household spend aggregates against the raw expense rows."""
+    problems = aggregates.verify()
+    for p in problems:
+        print(p)
+    print("Aggregates OK." if not problems else f"{len(problems)} mismatches found.")
+    if problems:
+        raise SystemExit(1)
+
+@main_bp.cli.command("rebuild-search")
+def rebuild_search_command():
+    """Re-index every expense for full-text search."""
+    rows = search.rebuild()
+    print(f"Rebuilt search index ({rows} expenses).")
+
+@main_bp.cli.command("verify-search")
+def verify_search_command():
+    """Check the full-text search index against the expense table."""
+    problems = search.verify()
+    for p in problems:
+        print(p)
+    print("Search index OK." if not problems else f"{len(problems)} problems found.")
+    if problems:
+        raise SystemExit(1)
+
+@main_bp.cli.command("archive")
+@click.option("--before", type=int, default=None, help="Archive years before this one (default: current year).")
+@click.option("--household", type=int, default=None, help="Only this household.")
+def archive_command(before, household):
+    """Move closed years of expenses into columnar snapshots under ARCHIVE_DIR."""
+    before = min(before or date.today().year, date.today().year)
+    for hid, year in archive.closed_years(before, household):
+        moved = archive.archive_year(hid, year)
+        print(f"household {hid} {year}: archived {moved} expenses")
+
+@main_bp.cli.command("restore-archive")
+@click.argument("household", type=int)
+@click.argument("year", type=int)
+def restore_archive_command(household, year):
+    """Move an archived year back into the expense tables."""
+    try:
+        restored = archive.restore_year(household, year)
+    except archive.ArchiveError as exc:
+        raise click.ClickException(str(exc))
+    print(f"household {household} {year}: restored {restored} expenses")
 
 # ---------- UI routes ----------
-@app.route("/")
+@main_bp.route("/")
 def index():
     if current_user.is_authenticated:
-        return redirect(url_for("dashboard"))
+        return redirect(url_for("main.dashboard"))
     return render_template("index.html")
 
-@app.route("/dashboard")
+@main_bp.route("/dashboard")
 @login_required
 def dashboard():
-    hh = db.session.get(Household, current_user.household_id) if current_user.household_id else None
+    hh = identity_cache.get_household(current_user.household_id) if current_user.household_id else None
     budget = hh.budget if hh else 0.0
-    expenses = Expense.query.filter_by(household_id=current_user.household_id).all() if hh else []
-    total_spent = sum(e.amount for e in expenses)
+    total_spent = aggregates.household_total(hh.id) if hh else 0.0
     remaining = budget - total_spent
     invite = hh.invite_code if hh else ""
     
@@ -67,25 +209,30 @@ def dashboard():
     return render_template("dashboard.html", budget=budget, total_spent=total_spent, 
                          remaining=remaining, invite=invite, is_admin=is_admin)
 
-@app.route("/invite")
+@main_bp.route("/invite")
 @login_required
 def invite_page():
     return render_template("invite.html")
 
 # ---------- API: household invite join ----------
-@app.route("/join/<invite_code>", methods=["GET"])
+@main_bp.route("/join/<invite_code>", methods=["GET"])
 @login_required
+@with_write_retry
 def join_invite(invite_code):
     hh = Household.query.filter_by(invite_code=invite_code).first()
     if not hh:
         return "Invalid invite code", 404
+    versions.bump(current_user.household_id)  # member leaves the old household
     current_user.household_id = hh.id
+    versions.bump(hh.id)
     db.session.commit()
-    return redirect(url_for("dashboard"))
+    identity_cache.invalidate_user(current_user.id)
+    return redirect(url_for("main.dashboard"))
 
 # ---------- API: Get household members ----------
-@app.route("/api/members", methods=["GET"])
+@main_bp.route("/api/members", methods=["GET"])
 @login_required
+@versions.conditional
 def api_get_members():
     if not current_user.household_id:
         return jsonify({"error": "user not in household"}), 400
@@ -103,14 +250,21 @@ def api_get_members():
     return jsonify({"members": members_data})
 
 # ---------- API: set household budget (Admin only) ----------
-@app.route("/api/budget", methods=["GET", "POST"])
+@main_bp.route("/api/budget", methods=["GET", "POST"])
 @login_required
+@with_write_retry
+@versions.conditional
 def api_budget():
     if request.method == "GET":
-        hh = db.session.get(Household, current_user.household_id)
+        hh = identity_cache.get_household(current_user.household_id)
         budget = hh.budget if hh else 0.0
-        # calculate spent in whole household (all-time) or we could support range
-        total_spent = sum(e.amount for e in Expense.query.filter_by(household_id=current_user.household_id).all()) if hh else 0.0
+        # spent in whole household (all-time), or within ?start=&end= (YYYY-MM-DD) from the daily totals
+        try:
+            start = date.fromisoformat(request.args["start"]) if request.args.get("start") else None
+            end = date.fromisoformat(request.args["end"]) if request.args.get("end") else None
+        except ValueError:
+            return jsonify({"error": "start and end must be YYYY-MM-DD"}), 400
+        total_spent = aggregates.range_total(hh.id, start, end) if hh else 0.0
         return jsonify({"budget": budget, "spent": total_spent, "remaining": (budget - total_spent)})
     else:
         # Check if current user is admin
@@ -119,16 +273,19 @@ def api_budget():
             
         data = request.get_json(force=True)
         amount = float(data.get("amount") or 0)
-        hh = db.session.get(Household, current_user.household_id)
+        hh = identity_cache.get_household(current_user.household_id)
         if not hh:
             return jsonify({"error": "no household"}), 400
         hh.budget = amount
+        versions.bump(hh.id)
         db.session.commit()
+        identity_cache.invalidate_household(hh.id)
         return jsonify({"message": "budget set", "amount": amount})
 
 # ---------- API: add expense (automatically split equally among all active members) ----------
-@app.route("/api/expense", methods=["POST"])
+@main_bp.route("/api/expense", methods=["POST"])
 @login_required
+@with_write_retry
 def api_add_expense():
     data = request.get_json(force=True)
     item = data.get("item")
@@ -137,7 +294,7 @@ def api_add_expense():
     date_str = data.get("date")
     time_str = data.get("time")
 
-    if not item or amount <= 0:
+    if not item or not math.isfinite(amount) or amount <= 0:
         return jsonify({"error": "invalid input"}), 400
     if not current_user.household_id:
         return jsonify({"error": "user not in household"}), 400
@@ -149,52 +306,169 @@ def api_add_expense():
                   household_id=current_user.household_id, category=category,
                   date=dt_date, time=dt_time)
     db.session.add(exp)
-    db.session.commit()
+    db.session.flush()  # assigns exp.id without committing
     sp = Split(expense_id=exp.id, user_id=current_user.id, share_amount=amount)
     db.session.add(sp)
-
-    
+    aggregates.record_expenses([exp])
+    analytics.record_expenses([exp])
+    changelog.log_expenses(exp.household_id, [exp.id])
+    versions.bump(exp.household_id)
     db.session.commit()
     return jsonify({"message": "expense added", "expense_id": exp.id})
 
+# ---------- API: bulk import (JSON array, or a CSV/XLSX upload in the report format) ----------
+# Parsing and validation run once; only the insert is retried, since an upload stream can be read only once.
+@main_bp.route("/api/expenses/import", methods=["POST"])
+@login_required
+def api_import_expenses():
+    if not current_user.household_id:
+        return jsonify({"error": "user not in household"}), 400
+    try:
+        if "file" in request.files:
+            rows = importer.parse_upload(request.files["file"])
+        else:
+            rows = importer.parse_json(request.get_json(force=True))
+        clean, errors = importer.validate(rows, current_user.household_id, current_user.id)
+    except importer.InvalidImport as exc:
+        return jsonify({"error": str(exc)}), 400
+    if errors:
+        return jsonify({"error": "validation failed", "errors": errors}), 400
+    ids = importer.insert_rows(clean)
+    return jsonify({"message": "expenses imported", "imported": len(ids), "expense_ids": ids})
+
 # ---------- API: list expenses with shares (optionally filter by range) ----------
-@app.route("/api/expenses", methods=["GET"])
+# ?limit=N[&cursor=...] returns one newest-first page plus "next_cursor";
+# ?format=ndjson streams every matching row, one JSON object per line, ending with a totals line.
+@main_bp.route("/api/expenses", methods=["GET"])
 @login_required
+@versions.conditional
 def api_list_expenses():
-    start = request.args.get("start")  # YYYY-MM-DD
-    end = request.args.get("end")
+    try:  # YYYY-MM-DD
+        start = date.fromisoformat(request.args["start"]) if request.args.get("start") else None
+        end = date.fromisoformat(request.args["end"]) if request.args.get("end") else None
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD"}), 400
     q = Expense.query.filter_by(household_id=current_user.household_id)
     if start:
-        q = q.filter(Expense.date >= date.fromisoformat(start))
+        q = q.filter(Expense.date >= start)
     if end:
-        q = q.filter(Expense.date <= date.fromisoformat(end))
-    rows = []
-    for e in q.order_by(Expense.date.desc(), Expense.time.desc()).all():
-        shares = Split.query.filter_by(expense_id=e.id).all()
-        shares_out = []
-        for s in shares:
-            user = db.session.get(User, s.user_id)
-            # Handle case where user might be None or inactive
-            display_name = "Unknown User"
-            if user and user.is_active:
-                display_name = user.display_name if user.display_name else user.email
-            shares_out.append({"user_id": s.user_id, "share_amount": s.share_amount, "display_name": display_name})
-        payer = db.session.get(User, e.payer_id)
-        payer_name = "Unknown Payer"
-        if payer and payer.is_active:
-            payer_name = payer.display_name if payer.display_name else payer.email
-        rows.append({
-            "id": e.id, "item": e.item, "amount": e.amount,
-            "payer_id": e.payer_id, "payer_name": payer_name,
-            "category": e.category, "date": e.date.isoformat(), "time": e.time.strftime("%H:%M"),
-            "shares": shares_out
-        })
-    total = sum(r["amount"] for r in rows)
-    return jsonify({"expenses": rows, "total": total})
+        q = q.filter(Expense.date <= end)
+    seq = changelog.latest_seq(current_user.household_id)  # read first: later changes show up in the feed
+    # from the daily totals, so archived years count as they do on /dashboard and /api/budget
+    total = aggregates.range_total(current_user.household_id, start, end)
+
+    if request.args.get("format") == "ndjson":
+        def generate():
+            count = 0
+            for row in iter_expense_dicts(q):
+                count += 1
+                yield json.dumps(row) + "\n"
+            yield json.dumps({"total": total, "count": count}) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    if limit is None and not cursor:
+        expenses, splits, users = load_expenses(newest_first(q))
+        rows = [expense_to_dict(e, splits.get(e.id, []), users) for e in expenses]
+        return jsonify({"expenses": rows, "total": total, "seq": seq})
+
+    try:
+        key = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "invalid cursor"}), 400
+    limit = min(max(limit or PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    expenses, splits, users, next_cursor = load_page(q, limit, key)
+    rows = [expense_to_dict(e, splits.get(e.id, []), users) for e in expenses]
+    return jsonify({"expenses": rows, "total": total, "next_cursor": next_cursor, "seq": seq})
+
+# ---------- API: full-text search ----------
+# ?q=words matches item and category by word prefix, best match first, optionally narrowed by
+# start/end dates, min_amount/max_amount and payer_id. Pages with ?limit=N and "next_cursor".
+# Only the newest SEARCH_RANK_WINDOW matches are ranked; when more match, older ones follow
+# newest first and the response says so with "ranking": {"complete": false, "window": N}.
+@main_bp.route("/api/expenses/search", methods=["GET"])
+@login_required
+@versions.conditional
+def api_search_expenses():
+    if not current_user.household_id:
+        return jsonify({"error": "user not in household"}), 400
+    args = request.args
+    try:
+        start = date.fromisoformat(args["start"]) if args.get("start") else None
+        end = date.fromisoformat(args["end"]) if args.get("end") else None
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD"}), 400
+    try:
+        offset = search.decode_cursor(args["cursor"]) if args.get("cursor") else 0
+        limit = min(max(args.get("limit", type=int) or search.PAGE_SIZE, 1), MAX_PAGE_SIZE)
+        expenses, splits, users, next_cursor, complete = search.search(
+            current_user.household_id, args.get("q"), start=start, end=end,
+            min_amount=args.get("min_amount", type=float), max_amount=args.get("max_amount", type=float),
+            payer_id=args.get("payer_id", type=int), limit=limit, offset=offset)
+    except search.InvalidSearch as exc:
+        return jsonify({"error": str(exc)}), 400
+    rows = [expense_to_dict(e, splits.get(e.id, []), users) for e in expenses]
+    return jsonify({"expenses": rows, "next_cursor": next_cursor,
+                    "ranking": {"complete": complete, "window": current_app.config["SEARCH_RANK_WINDOW"]}})
+
+# ---------- API: archived periods ----------
+# Years moved to cold storage; their totals still count everywhere and reports include them.
+@main_bp.route("/api/archive", methods=["GET"])
+@login_required
+@versions.conditional
+def api_archive():
+    return jsonify({"periods": [
+        {"start": p.period_start.isoformat(), "end": p.period_end.isoformat(), "expenses": p.expense_count,
+         "total": round(p.total, 2), "archived_at": p.archived_at.isoformat() if p.archived_at else None}
+        for p in archive.periods(current_user.household_id)]})
+
+# ---------- API: delta sync feed ----------
+# ?since=<seq> returns expenses changed after that point plus ids that were removed.
+@main_bp.route("/api/expenses/changes", methods=["GET"])
+@login_required
+@versions.conditional
+def api_expense_changes():
+    if not current_user.household_id:
+        return jsonify({"error": "user not in household"}), 400
+    since = request.args.get("since", type=int)
+    if since is None or since < 0:
+        return jsonify({"error": "since is required"}), 400
+    limit = min(max(request.args.get("limit", changelog.FEED_LIMIT, type=int), 1), changelog.FEED_LIMIT)
+    out = changelog.changes_since(current_user.household_id, since, limit)
+    out["total"] = aggregates.household_total(current_user.household_id)
+    return jsonify(out)
+
+# ---------- API: spend analytics from the rollup ----------
+# ?by=category,member,month (any of category/member/day/week/month) &start=&end= (YYYY-MM-DD)
+@main_bp.route("/api/analytics", methods=["GET"])
+@login_required
+def api_analytics():
+    if not current_user.household_id:
+        return jsonify({"error": "user not in household"}), 400
+    groups = [g.strip() for g in (request.args.get("by") or "category,member,month").split(",") if g.strip()]
+    unknown = [g for g in groups if g not in analytics.GROUPINGS]
+    if unknown:
+        return jsonify({"error": f"unknown grouping: {', '.join(unknown)}"}), 400
+    try:
+        start = date.fromisoformat(request.args["start"]) if request.args.get("start") else None
+        end = date.fromisoformat(request.args["end"]) if request.args.get("end") else None
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD"}), 400
+    return jsonify({g: analytics.spend_by(current_user.household_id, g, start, end) for g in groups})
+
+# ---------- API: settle up (who owes whom) ----------
+@main_bp.route("/api/settlement", methods=["GET"])
+@login_required
+def api_settlement():
+    if not current_user.household_id:
+        return jsonify({"error": "user not in household"}), 400
+    return jsonify(settlement.household_settlement(current_user.household_id))
 
 # ---------- API: Delete user (admin only) ----------
-@app.route("/api/user/<int:user_id>", methods=["DELETE"])
+@main_bp.route("/api/user/<int:user_id>", methods=["DELETE"])
 @login_required
+@with_write_retry
 def api_delete_user(user_id):
     # Check if current user is admin
     if not current_user.is_admin:
@@ -208,15 +482,19 @@ def api_delete_user(user_id):
     if user_to_delete.id == current_user.id:
         return jsonify({"error": "cannot delete yourself"}), 400
     
-    # Soft delete - mark as inactive
+    # Soft delete - mark as inactive (their name disappears from shared expenses)
+    changelog.log_member_expenses(user_to_delete.household_id, user_id)
     user_to_delete.is_active = False
+    versions.bump(user_to_delete.household_id)
     db.session.commit()
+    identity_cache.invalidate_user(user_id)
     
     return jsonify({"message": "user deactivated successfully"})
 
 # ---------- API: Transfer expenses to another user ----------
-@app.route("/api/user/<int:from_user_id>/transfer/<int:to_user_id>", methods=["POST"])
+@main_bp.route("/api/user/<int:from_user_id>/transfer/<int:to_user_id>", methods=["POST"])
 @login_required
+@with_write_retry
 def api_transfer_expenses(from_user_id, to_user_id):
     # Check if current user is admin
     if not current_user.is_admin:
@@ -227,26 +505,47 @@ def api_transfer_expenses(from_user_id, to_user_id):
     
     if not from_user or not to_user or from_user.household_id != current_user.household_id or to_user.household_id != current_user.household_id:
         return jsonify({"error": "invalid users"}), 400
+    if from_user_id == to_user_id:
+        return jsonify({"error": "cannot transfer a member to themselves"}), 400
     
-    # Transfer expenses
-    expenses = Expense.query.filter_by(payer_id=from_user_id).all()
-    for expense in expenses:
-        expense.payer_id = to_user_id
-    
-    # Transfer splits
-    splits = Split.query.filter_by(user_id=from_user_id).all()
-    for split in splits:
-        split.user_id = to_user_id
-    
-    # Soft delete the user
-    from_user.is_active = False
+    # Transfer expenses and splits, then soft delete the user
+    counts = admin_ops.transfer_member(current_user.household_id, from_user_id, to_user_id)
+    admin_ops.deactivate_members(current_user.household_id, [from_user_id])
+    versions.bump(current_user.household_id)
     db.session.commit()
+    identity_cache.invalidate_user(from_user_id)
     
-    return jsonify({"message": "expenses transferred and user deactivated"})
+    return jsonify(dict(counts, message="expenses transferred and user deactivated"))
+
+# ---------- API: Batch transfer / deactivate members (admin only) ----------
+# {"transfers": [{"from_user_id": 2, "to_user_id": 1}, ...], "deactivate": [5, 6]}
+@main_bp.route("/api/users/transfer", methods=["POST"])
+@login_required
+@with_write_retry
+def api_transfer_batch():
+    if not current_user.is_admin:
+        return jsonify({"error": "admin access required"}), 403
+    data = request.get_json(force=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "invalid request"}), 400
+    try:
+        transfers = [{"from_user_id": int(t["from_user_id"]), "to_user_id": int(t["to_user_id"])}
+                     for t in data.get("transfers") or []]
+        deactivate = [int(uid) for uid in data.get("deactivate") or []]
+        admin_ops.validate_batch(current_user.household_id, transfers, deactivate, current_user.id)
+    except (KeyError, TypeError, ValueError) as exc:
+        return jsonify({"error": str(exc) if isinstance(exc, admin_ops.InvalidTransfer) else "invalid request"}), 400
+    result = admin_ops.transfer_batch(current_user.household_id, transfers, deactivate)
+    versions.bump(current_user.household_id)
+    db.session.commit()
+    for uid in {t["from_user_id"] for t in transfers} | set(deactivate):
+        identity_cache.invalidate_user(uid)
+    return jsonify(dict(result, message="members transferred and deactivated"))
 
 # ---------- API: Make user admin ----------
-@app.route("/api/user/<int:user_id>/make_admin", methods=["POST"])
+@main_bp.route("/api/user/<int:user_id>/make_admin", methods=["POST"])
 @login_required
+@with_write_retry
 def api_make_admin(user_id):
     # Check if current user is admin
     if not current_user.is_admin:
@@ -257,57 +556,89 @@ def api_make_admin(user_id):
         return jsonify({"error": "user not found"}), 404
     
     user.is_admin = True
+    versions.bump(user.household_id)
     db.session.commit()
+    identity_cache.invalidate_user(user_id)
     
     return jsonify({"message": "user is now an admin"})
 
+# ---------- API: request metrics (admin) ----------
+# Per-route latency histograms for the worker that answers; enable with METRICS_ENABLED=1.
+@main_bp.route("/api/admin/metrics", methods=["GET", "DELETE"])
+@login_required
+def api_admin_metrics():
+    if not current_user.is_admin:
+        return jsonify({"error": "admin access required"}), 403
+    if request.method == "DELETE":
+        metrics.reset()
+    return jsonify(metrics.snapshot())
+
 # ---------- API: report export (daily/monthly/yearly/full) ----------
-@app.route("/api/report/<period>", methods=["GET"])
+# ?format=csv streams the Expenses sheet as CSV instead of building an .xlsx file.
+@main_bp.route("/api/report/<period>", methods=["GET"])
 @login_required
 def api_report(period):
-    today = date.today()
-    q = Expense.query.filter_by(household_id=current_user.household_id)
-    if period == "daily":
-        q = q.filter(Expense.date == today)
-    elif period == "monthly":
-        start = today.replace(day=1)
-        q = q.filter(Expense.date >= start)
-    elif period == "yearly":
-        start = date(today.year, 1, 1)
-        q = q.filter(Expense.date >= start)
-    # full -> no filter
-
-    rows = []
-    total_spent = 0.0
-    for e in q.order_by(Expense.date.asc(), Expense.time.asc()).all():
-        shares = Split.query.filter_by(expense_id=e.id).all()
-        participant_list = []
-        for s in shares:
-            user = db.session.get(User, s.user_id)
-            user_name = user.display_name if user and user.is_active else "Unknown User"
-            participant_list.append(f"{user_name} ({s.share_amount})")
-        participants = "; ".join(participant_list)
-        payer = db.session.get(User, e.payer_id)
-        payer_name = payer.display_name if payer and payer.is_active else "Unknown Payer"
-        rows.append({"Item": e.item, "Amount": e.amount, "Payer": payer_name, "Category": e.category or "", "Date": e.date.isoformat(), "Time": e.time.strftime("%H:%M"), "Participants (share)": participants})
-        total_spent += float(e.amount)
-
-    hh = db.session.get(Household, current_user.household_id)
-    budget = hh.budget if hh else 0.0
-    remaining = budget - total_spent
-
-    df = pd.DataFrame(rows)
+    if period not in reports.PERIODS:
+        return jsonify({"error": "unknown period"}), 400
+    start, end = reports.period_window(period)
     stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    fname = f"report_{period}_{stamp}.xlsx"
-    outpath = os.path.join(REPORTS_DIR, fname)
-    with pd.ExcelWriter(outpath, engine="openpyxl") as writer:
-        if not df.empty:
-            df.to_excel(writer, sheet_name="Expenses", index=False)
-        else:
-            pd.DataFrame(columns=["Item","Amount","Payer","Category","Date","Time","Participants (share)"]).to_excel(writer, sheet_name="Expenses", index=False)
-        summary = pd.DataFrame([{"Metric":"Budget","Value":budget},{"Metric":"Total Spent","Value":total_spent},{"Metric":"Remaining","Value":remaining}])
-        summary.to_excel(writer, sheet_name="Summary", index=False)
-    return send_file(outpath, as_attachment=True)
+
+    if request.args.get("format") == "csv":
+        hid = current_user.household_id
+        return Response(stream_with_context(reports.iter_csv(hid, start, end)), mimetype="text/csv",
+                        headers={"Content-Disposition": f"attachment; filename=report_{period}_{stamp}.csv"})
+
+    fh = report_jobs.build_cached(current_user.household_id, period)
+    return send_file(fh, as_attachment=True, download_name=f"report_{period}_{stamp}.xlsx", mimetype=XLSX_MIMETYPE)
+
+# ---------- API: background report jobs ----------
+@main_bp.route("/api/report/<period>/jobs", methods=["POST"])
+@login_required
+@with_write_retry
+def api_report_submit(period):
+    if period not in reports.PERIODS:
+        return jsonify({"error": "unknown period"}), 400
+    if not current_user.household_id:
+        return jsonify({"error": "user not in household"}), 400
+    job = report_jobs.submit(current_user.household_id, current_user.id, period)
+    return jsonify(report_jobs.to_dict(job)), 202
+
+def _household_job(job_id):
+    job = db.session.get(ReportJob, job_id)
+    if not job or job.household_id != current_user.household_id:
+        return None
+    return job
+
+@main_bp.route("/api/report/jobs/<job_id>", methods=["GET"])
+@login_required
+def api_report_job_status(job_id):
+    job = _household_job(job_id)
+    if not job:
+        return jsonify({"error": "job not found"}), 404
+    report_jobs.recover(job)
+    out = report_jobs.to_dict(job)
+    if job.status == "done":
+        out["download_url"] = url_for("main.api_report_job_download", job_id=job.id)
+    return jsonify(out)
+
+@main_bp.route("/api/report/jobs/<job_id>/download", methods=["GET"])
+@login_required
+def api_report_job_download(job_id):
+    job = _household_job(job_id)
+    if not job:
+        return jsonify({"error": "job not found"}), 404
+    if job.status != "done":
+        return jsonify(report_jobs.to_dict(job)), 409
+    try:
+        fh = open(job.path, "rb")
+    except (FileNotFoundError, TypeError):
+        # evicted from the report cache since the job finished; build it again
+        report_jobs.requeue(job)
+        return jsonify(report_jobs.to_dict(job)), 409
+    stamp = (job.finished_at or datetime.utcnow()).strftime("%Y%m%d_%H%M%S")
+    return send_file(fh, as_attachment=True, download_name=f"report_{job.period}_{stamp}.xlsx", mimetype=XLSX_MIMETYPE)
+
+app = create_app()
 
 # ---------- run ----------
 if __name__ == "__main__":
@@ -0,0 +1,372 @@
+# archive.py
+# Cold storage for closed periods. archive_year() moves one household's expenses for a past
+# calendar year out of the Expense/Split tables into a columnar snapshot under ARCHIVE_DIR and
+# records its totals (ArchivedPeriod) and per-member balances (ArchivedBalance) in the database.
+# Daily totals and the analytics rollup are left untouched, so budgets and analytics keep
+# counting archived spend; reports read the snapshots alongside the hot rows via iter_expenses().
+#
+# Snapshot layout (one directory, never modified once ArchivedPeriod points at it; member
+# reassignment writes a new one): numeric columns as .npy files that load memory-mapped, item
+# names as gzip-compressed JSON, and meta.json with the category dictionary and totals. Rows are
+# sorted by (date, time, id) so a date window is two binary searches. numpy is imported only where
+# snapshots are written or mapped, so importing this module stays cheap.
+import gzip
+import json
+import os
+import shutil
+import uuid
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import Integer, event, func, insert, select, update
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Expense, Split, ArchivedPeriod, ArchivedBalance
+import changelog
+import versions
+
+FORMAT = 1
+COLUMNS = {"expense_id": "int64", "day": "int32", "time_us": "int64", "amount": "float64",
+           "payer_id": "int64", "category": "int32", "created_us": "int64",
+           "split_offsets": "int64", "split_user": "int64", "split_share": "float64"}
+NONE = -1  # stands in for NULL in integer columns
+EPOCH = datetime(1970, 1, 1)
+US = timedelta(microseconds=1)
+
+ArchivedExpense = namedtuple("ArchivedExpense", "id item amount payer_id category date time")
+ArchivedShare = namedtuple("ArchivedShare", "user_id share_amount")
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def archive_dir():
+    return current_app.config["ARCHIVE_DIR"]
+
+def year_window(year):
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+# ---------- encoding ----------
+def _time_us(t):
+    return NONE if t is None else ((t.hour * 60 + t.minute) * 60 + t.second) * 1000000 + t.microsecond
+
+def _time(us):
+    if us == NONE:
+        return None
+    s, micro = divmod(int(us), 1000000)
+    return time(s // 3600, s // 60 % 60, s % 60, micro)
+
+def _write_snapshot(rel_path, rows):
+    """Write rows (dicts sorted by date/time/id, with "shares") into a new snapshot directory."""
+    import numpy as np  # heavy; only archive maintenance and snapshot reads need it
+    path = os.path.join(archive_dir(), rel_path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp)
+    categories = sorted({r["category"] for r in rows if r["category"] is not None})
+    code = {c: i for i, c in enumerate(categories)}
+    offsets, users, shares = [0], [], []
+    for r in rows:
+        for uid, share in r["shares"]:
+            users.append(NONE if uid is None else uid)
+            shares.append(np.nan if share is None else share)
+        offsets.append(len(users))
+    cols = {
+        "expense_id": [r["id"] for r in rows],
+        "day": [r["date"].toordinal() for r in rows],
+        "time_us": [_time_us(r["time"]) for r in rows],
+        "amount": [np.nan if r["amount"] is None else r["amount"] for r in rows],
+        "payer_id": [NONE if r["payer_id"] is None else r["payer_id"] for r in rows],
+        "category": [NONE if r["category"] is None else code[r["category"]] for r in rows],
+        "created_us": [NONE if r["created_at"] is None else (r["created_at"] - EPOCH) // US for r in rows],
+        "split_offsets": offsets, "split_user": users, "split_share": shares,
+    }
+    for name, dtype in COLUMNS.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(cols[name], dtype=dtype))
+    with gzip.open(os.path.join(tmp, "items.json.gz"), "wt", encoding="utf-8") as fh:
+        json.dump([r["item"] for r in rows], fh)
+    meta = {"format": FORMAT, "rows": len(rows), "splits": len(users), "categories": categories,
+            "total": float(np.nansum(cols["amount"])) if rows else 0.0}
+    with open(os.path.join(tmp, "meta.json"), "w") as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, path)
+    return meta
+
+
+# ---------- reading ----------
+def _load_array(path):
+    import numpy as np
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:  # zero-length arrays cannot be mapped
+        return np.load(path)
+
+class Snapshot:
+    """Read-only view of one archived period; numeric columns are memory-mapped."""
+
+    def __init__(self, rel_path):
+        self.path = os.path.join(archive_dir(), rel_path)
+        with open(os.path.join(self.path, "meta.json")) as fh:
+            self.meta = json.load(fh)
+        for name in COLUMNS:
+            setattr(self, name, _load_array(os.path.join(self.path, f"{name}.npy")))
+        self._items = None
+
+    @property
+    def items(self):
+        if self._items is None:
+            with gzip.open(os.path.join(self.path, "items.json.gz"), "rt", encoding="utf-8") as fh:
+                self._items = json.load(fh)
+        return self._items
+
+    def bounds(self, start=None, end=None):
+        lo = int(self.day.searchsorted(start.toordinal(), "left")) if start else 0
+        hi = int(self.day.searchsorted(end.toordinal(), "right")) if end else len(self.day)
+        return lo, hi
+
+    def user_ids(self, lo, hi):
+        ids = set(self.payer_id[lo:hi].tolist())
+        ids.update(self.split_user[self.split_offsets[lo]:self.split_offsets[hi]].tolist())
+        ids.discard(NONE)
+        return ids
+
+    def rows(self, lo, hi):
+        """Yield (ArchivedExpense, [ArchivedShare]) for rows lo..hi-1."""
+        cats, items = self.meta["categories"], self.items
+        ids, days, times, amounts = (self.expense_id[lo:hi].tolist(), self.day[lo:hi].tolist(),
+                                     self.time_us[lo:hi].tolist(), self.amount[lo:hi].tolist())
+        payers, codes = self.payer_id[lo:hi].tolist(), self.category[lo:hi].tolist()
+        offsets = self.split_offsets[lo:hi + 1].tolist()
+        users = self.split_user[offsets[0]:offsets[-1]].tolist() if offsets else []
+        shares = self.split_share[offsets[0]:offsets[-1]].tolist() if offsets else []
+        base = offsets[0] if offsets else 0
+        for i in range(hi - lo):
+            e = ArchivedExpense(ids[i], items[lo + i], None if amounts[i] != amounts[i] else amounts[i],
+                                None if payers[i] == NONE else payers[i],
+                                None if codes[i] == NONE else cats[codes[i]],
+                                date.fromordinal(days[i]), _time(times[i]))
+            yield e, [ArchivedShare(None if users[j] == NONE else users[j],
+                                    None if shares[j] != shares[j] else shares[j])
+                      for j in range(offsets[i] - base, offsets[i + 1] - base)]
+
+    def to_dicts(self):
+        """All rows in the dict form _write_snapshot() takes, for rewrites and restores."""
+        created = self.created_us.tolist()
+        out = []
+        for i, (e, shares) in enumerate(self.rows(0, len(self.day))):
+            out.append({"id": e.id, "item": e.item, "amount": e.amount, "payer_id": e.payer_id,
+                        "category": e.category, "date": e.date, "time": e.time,
+                        "created_at": None if created[i] == NONE else EPOCH + created[i] * US,
+                        "shares": [(s.user_id, s.share_amount) for s in shares]})
+        return out
+
+def periods(household_id, start=None, end=None):
+    q = ArchivedPeriod.query.filter(ArchivedPeriod.household_id == household_id)
+    if start:
+        q = q.filter(ArchivedPeriod.period_end >= start)
+    if end:
+        q = q.filter(ArchivedPeriod.period_start <= end)
+    return q.order_by(ArchivedPeriod.period_start).all()
+
+def iter_expenses(household_id, start=None, end=None, periods_=None):
+    """Yield archived (ArchivedExpense, [ArchivedShare]) in the window, oldest first."""
+    for p in periods(household_id, start, end) if periods_ is None else periods_:
+        snap = Snapshot(p.path)
+        yield from snap.rows(*snap.bounds(start, end))
+
+def user_ids(household_id, start=None, end=None, periods_=None):
+    ids = set()
+    for p in periods(household_id, start, end) if periods_ is None else periods_:
+        snap = Snapshot(p.path)
+        ids |= snap.user_ids(*snap.bounds(start, end))
+    return ids
+
+def rollup_rows(household_id=None):
+    """{(household_id, day, category or "", payer_id): [total, count]} over every snapshot, for rebuild/verify."""
+    q = ArchivedPeriod.query
+    if household_id is not None:
+        q = q.filter(ArchivedPeriod.household_id == household_id)
+    acc = defaultdict(lambda: [0.0, 0])
+    for p in q.all():
+        snap = Snapshot(p.path)
+        cats = snap.meta["categories"]
+        for day, code, payer, amount in zip(snap.day.tolist(), snap.category.tolist(),
+                                            snap.payer_id.tolist(), snap.amount.tolist()):
+            key = (p.household_id, date.fromordinal(day), "" if code == NONE else cats[code],
+                   None if payer == NONE else payer)
+            acc[key][0] += 0.0 if amount != amount else amount
+            acc[key][1] += 1
+    return acc
+
+
+# ---------- archive / restore ----------
+def _hot_rows(household_id, start, end):
+    conds = [Expense.household_id == household_id, Expense.date >= start, Expense.date <= end]
+    rows = {}
+    for r in db.session.execute(select(Expense.id, Expense.item, Expense.amount, Expense.payer_id, Expense.category,
+                                       Expense.date, Expense.time, Expense.created_at).where(*conds)):
+        rows[r.id] = dict(r._mapping, shares=[])
+    for expense_id, uid, share in db.session.execute(
+            select(Split.expense_id, Split.user_id, Split.share_amount)
+            .where(Split.expense_id.in_(select(Expense.id).where(*conds))).order_by(Split.id)):
+        rows[expense_id]["shares"].append((uid, share))
+    return list(rows.values())
+
+def _balances(rows):
+    net = defaultdict(float)
+    for r in rows:
+        if r["payer_id"] is not None:
+            net[r["payer_id"]] += r["amount"] or 0.0
+        for uid, share in r["shares"]:
+            if uid is not None:
+                net[uid] -= share or 0.0
+    return net
+
+def _sort_key(r):
+    return r["date"], _time_us(r["time"]), r["id"]
+
+def archive_year(household_id, year):
+    """Move the household's expenses dated in `year` into cold storage and commit.
+
+    Merges with an existing snapshot for that year. Returns the number of rows moved out of the
+    hot tables. Only closed years (before the current one) can be archived.
+    """
+    if year >= date.today().year:
+        raise ArchiveError("only past years can be archived")
+    start, end = year_window(year)
+    hot = _hot_rows(household_id, start, end)
+    if not hot:
+        return 0
+    existing = db.session.get(ArchivedPeriod, (household_id, start))
+    rows = sorted(hot + (Snapshot(existing.path).to_dicts() if existing else []), key=_sort_key)
+
+    rel_path = os.path.join(f"hh{household_id}", f"{year}.{uuid.uuid4().hex[:8]}")
+    os.makedirs(os.path.join(archive_dir(), f"hh{household_id}"), exist_ok=True)
+    meta = _write_snapshot(rel_path, rows)
+    old_path = existing.path if existing else None
+    try:
+        if existing is None:
+            existing = ArchivedPeriod(household_id=household_id, period_start=start)
+            db.session.add(existing)
+        existing.period_end, existing.path = end, rel_path
+        existing.expense_count, existing.split_count, existing.total = meta["rows"], meta["splits"], meta["total"]
+        existing.archived_at = datetime.utcnow()
+        ArchivedBalance.query.filter_by(household_id=household_id, period_start=start).delete(
+            synchronize_session=False)
+        db.session.execute(insert(ArchivedBalance), [
+            {"household_id": household_id, "period_start": start, "user_id": uid, "net": net}
+            for uid, net in _balances(rows).items()])
+
+        conds = [Expense.household_id == household_id, Expense.date >= start, Expense.date <= end]
+        db.session.execute(Split.__table__.delete().where(Split.expense_id.in_(select(Expense.id).where(*conds))))
+        db.session.execute(Expense.__table__.delete().where(*conds))
+        changelog.log_expenses(household_id, [r["id"] for r in hot], op="delete")
+        versions.bump(household_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        shutil.rmtree(os.path.join(archive_dir(), rel_path), ignore_errors=True)
+        raise
+    if old_path:
+        shutil.rmtree(os.path.join(archive_dir(), old_path), ignore_errors=True)
+    return len(hot)
+
+def restore_year(household_id, year):
+    """Move an archived year back into the hot tables and commit. Returns the number of rows restored.
+
+    Rows keep their ids unless a hot expense has taken the id since; those get a fresh one.
+    """
+    start, _ = year_window(year)
+    period = db.session.get(ArchivedPeriod, (household_id, start))
+    if period is None:
+        raise ArchiveError(f"{year} is not archived for household {household_id}")
+    rows = Snapshot(period.path).to_dicts()
+    ids = [r["id"] for r in rows]
+    taken = set(db.session.scalars(select(Expense.id).where(Expense.id.between(min(ids), max(ids))))) & set(ids)
+
+    def expense_row(r, keep_id):
+        out = {k: r[k] for k in ("item", "amount", "payer_id", "category", "date", "time", "created_at")}
+        out["household_id"] = household_id
+        if keep_id:
+            out["id"] = r["id"]
+        return out
+
+    keep = [r for r in rows if r["id"] not in taken]
+    moved = [r for r in rows if r["id"] in taken]
+    if keep:
+        db.session.execute(insert(Expense), [expense_row(r, True) for r in keep])
+    new_ids = []
+    if moved:
+        result = db.session.execute(insert(Expense).returning(Expense.id, sort_by_parameter_order=True),
+                                    [expense_row(r, False) for r in moved])
+        new_ids = [x[0] for x in result]
+    pairs = [(r["id"], r) for r in keep] + list(zip(new_ids, moved))
+    splits = [{"expense_id": eid, "user_id": uid, "share_amount": share}
+              for eid, r in pairs for uid, share in r["shares"]]
+    if splits:
+        db.session.execute(insert(Split), splits)
+    ArchivedBalance.query.filter_by(household_id=household_id, period_start=start).delete(synchronize_session=False)
+    db.session.delete(period)
+    changelog.log_expenses(household_id, [eid for eid, _ in pairs])
+    versions.bump(household_id)
+    db.session.commit()
+    shutil.rmtree(os.path.join(archive_dir(), period.path), ignore_errors=True)
+    return len(rows)
+
+def closed_years(before_year, household_id=None):
+    """[(household_id, year)] with hot expenses dated before `before_year`."""
+    year = func.cast(func.strftime("%Y", Expense.date), Integer)
+    q = db.session.query(Expense.household_id, year).filter(
+        Expense.household_id.isnot(None), Expense.date < date(before_year, 1, 1))
+    if household_id is not None:
+        q = q.filter(Expense.household_id == household_id)
+    return sorted(q.distinct().all())
+
+
+# ---------- member reassignment ----------
+def reassign_member(household_id, from_user_id, to_user_id):
+    """Point from_user's archived payments, shares and balances at to_user. Does not commit.
+
+    Affected snapshots are copied to new directories with the rewritten columns and
+    ArchivedPeriod.path is switched in the caller's transaction. The old directories are removed
+    once it commits and the new ones if it does not, so files and rows never disagree.
+    """
+    import numpy as np
+    db.session.execute(update(ArchivedBalance)
+                       .where(ArchivedBalance.household_id == household_id, ArchivedBalance.user_id == from_user_id)
+                       .values(user_id=to_user_id).execution_options(synchronize_session=False))
+    for p in periods(household_id):
+        snap = Snapshot(p.path)
+        changed = {name: getattr(snap, name) for name in ("payer_id", "split_user")
+                   if (getattr(snap, name) == from_user_id).any()}
+        if not changed:
+            continue
+        rel_path = os.path.join(f"hh{household_id}", f"{p.period_start.year}.{uuid.uuid4().hex[:8]}")
+        path = os.path.join(archive_dir(), rel_path)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        shutil.copytree(snap.path, tmp)
+        for name, col in changed.items():
+            np.save(os.path.join(tmp, f"{name}.npy"),
+                    np.where(col == from_user_id, to_user_id, col).astype(COLUMNS[name]))
+        os.replace(tmp, path)
+        _swap_on_commit(snap.path, path)
+        p.path = rel_path
+
+
+# ---------- snapshot swaps ----------
+# Directories replaced inside an open transaction are recorded on the session; whichever way the
+# transaction ends decides which of each pair is deleted.
+def _swap_on_commit(old_path, new_path):
+    db.session.info.setdefault("archive_swaps", []).append((old_path, new_path))
+
+@event.listens_for(Session, "after_commit")
+def _commit_swaps(session):
+    for old_path, _ in session.info.pop("archive_swaps", ()):
+        shutil.rmtree(old_path, ignore_errors=True)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_swaps(session, transaction):
+    if transaction.parent is None:  # rolled back or closed without a commit
+        for _, new_path in session.info.pop("archive_swaps", ()):
+            shutil.rmtree(new_path, ignore_errors=True)
@@ -3,7 +3,9 @@ from flask import Blueprint, render_template, redirect, url_for, request, flash
 from flask_login import login_user, logout_user, login_required
 from werkzeug.security import generate_password_hash, check_password_hash
 from models import db, User, Household
-from flask_dance.contrib.google import make_google_blueprint, google
+import changelog
+import identity_cache
+import versions
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -12,6 +14,7 @@ def make_google_bp():
     client_secret = os.environ.get("GOOGLE_CLIENT_SECRET")
     if not client_id or not client_secret:
         return None
+    from flask_dance.contrib.google import make_google_blueprint
     google_bp = make_google_blueprint(
         client_id=client_id,
         client_secret=client_secret,
@@ -31,7 +34,7 @@ def login():
             return render_template("login.html")
         if check_password_hash(user.password_hash, pw):
             login_user(user)
-            return redirect(url_for("dashboard"))
+            return redirect(url_for("main.dashboard"))
         flash("Invalid credentials")
     return render_template("login.html")
 
@@ -55,9 +58,13 @@ def register():
                 existing_user.is_active = True
                 existing_user.password_hash = generate_password_hash(pw)
                 existing_user.display_name = display
+                # their expenses show the new name again, so feed clients must refetch them
+                changelog.log_member_expenses(existing_user.household_id, existing_user.id)
+                versions.bump(existing_user.household_id)
                 db.session.commit()
+                identity_cache.invalidate_user(existing_user.id)
                 login_user(existing_user)
-                return redirect(url_for("dashboard"))
+                return redirect(url_for("main.dashboard"))
 
         if invite:
             hh = Household.query.filter_by(invite_code=invite).first()
@@ -90,9 +97,12 @@ def register():
             db.session.add(hh)
 
         db.session.add(user)
+        versions.bump(hh.id)
         db.session.commit()
+        identity_cache.invalidate_user(user.id)
+        identity_cache.invalidate_household(hh.id)
         login_user(user)
-        return redirect(url_for("dashboard"))
+        return redirect(url_for("main.dashboard"))
     return render_template("register.html")
 
 @auth_bp.route("/logout")
@@ -106,4 +116,4 @@ def google_authorized():
     # This route is used after OAuth flow; handled in app.py via blueprint registration
     # If Google blueprint is present, handle logic in app.py or here by reading google.session
     # Keep a placeholder if needed.
-    return redirect(url_for("dashboard"))
\ No newline at end of file
+    return redirect(url_for("main.dashboard"))
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""Member transfer benchmark: set-based admin_ops vs the previous per-object ORM loop.
+
+Seeds a scratch database where one member owns N expenses (and N splits), copies it per
+variant and times a full transfer + deactivation. Usage:
+
+    python benchmarks/admin_transfer.py [--rows 100000]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(db_path, rows):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO household (id, name, invite_code, budget) VALUES (1, 'bench', 'bench001', 0)")
+    con.executemany("INSERT INTO user (id, email, display_name, household_id, is_active, is_admin) VALUES (?, ?, ?, 1, 1, ?)",
+                    [(1, "admin@bench", "Admin", 1), (2, "leaving@bench", "Leaving", 0)])
+    con.executemany("INSERT INTO expense (id, item, amount, payer_id, household_id, category, date, time) "
+                    "VALUES (?, ?, 10.0, 2, 1, 'food', ?, '12:00:00.000000')",
+                    [(i, f"item {i}", f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}") for i in range(1, rows + 1)])
+    con.executemany("INSERT INTO split (expense_id, user_id, share_amount) VALUES (?, 2, 10.0)",
+                    [(i,) for i in range(1, rows + 1)])
+    con.commit()
+    con.close()
+
+
+def legacy_transfer(from_user_id, to_user_id):
+    from extensions import db
+    from models import User, Expense, Split
+    for expense in Expense.query.filter_by(payer_id=from_user_id).all():
+        expense.payer_id = to_user_id
+    for split in Split.query.filter_by(user_id=from_user_id).all():
+        split.user_id = to_user_id
+    db.session.get(User, from_user_id).is_active = False
+    db.session.commit()
+
+
+def bulk_transfer(from_user_id, to_user_id):
+    import admin_ops
+    from extensions import db
+    counts = admin_ops.transfer_member(1, from_user_id, to_user_id)
+    admin_ops.deactivate_members(1, [from_user_id])
+    db.session.commit()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory(prefix="bench_transfer_")
+    os.environ["DATA_DIR"] = os.environ["REPORTS_DIR"] = scratch.name
+    sys.path.insert(0, ROOT)
+    from app import app
+    import analytics
+    import migrations
+    from extensions import db
+
+    db_path = os.path.join(scratch.name, "expenses.db")
+    with app.app_context():
+        migrations.ensure_schema()
+    with app.app_context():
+        db.engine.dispose()
+    seed(db_path, args.rows)
+    with app.app_context():
+        analytics.rebuild()
+        db.engine.dispose()
+    pristine = db_path + ".seed"
+    shutil.copy(db_path, pristine)
+
+    results = {"rows": args.rows}
+    for name, fn in (("orm_loop", legacy_transfer), ("bulk_update", bulk_transfer)):
+        shutil.copy(pristine, db_path)
+        with app.app_context():
+            t0 = time.perf_counter()
+            fn(2, 1)
+            results[f"{name}_s"] = round(time.perf_counter() - t0, 3)
+            db.engine.dispose()
+    results["speedup"] = round(results["orm_loop_s"] / results["bulk_update_s"], 1)
+    print(json.dumps(results, indent=2))
+    scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Archival benchmark: hot-path latency before and after moving past years to cold storage.
+
+Generates one household with several years of history, times the hot read paths, archives
+every closed year, and times them again. The full report is timed too, since it now merges
+the snapshots back in. Usage:
+
+    python benchmarks/archive.py [--years 5] [--expenses 200000] [--repeat 20]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date
+
+import synthetic
+
+HOT_PATHS = {"expenses_page": "/api/expenses?limit=100", "expenses_this_month": "/api/expenses?start={month}",
+             "expenses_all": "/api/expenses", "budget": "/api/budget", "report_monthly_csv": "/api/report/monthly?format=csv"}
+
+
+def timed(client, url, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        r = client.get(url)
+        r.get_data()
+        samples.append((time.perf_counter() - t0) * 1000)
+        assert r.status_code == 200, (url, r.status_code)
+    return round(statistics.median(samples), 2)
+
+def _measure(repeat, queue):
+    import settlement
+    from app import app
+    client = app.test_client()
+    client.post("/auth/login", data={"email": synthetic.member_email(1, 0), "password": synthetic.PASSWORD})
+    month = date.today().replace(day=1).isoformat()
+    out = {name: timed(client, url.format(month=month), repeat) for name, url in HOT_PATHS.items()}
+    with app.app_context():
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            settlement.net_balances(1)
+        out["net_balances"] = round((time.perf_counter() - t0) * 1000 / repeat, 2)
+    out["full_report_csv"] = timed(client, "/api/report/full?format=csv", max(1, repeat // 10))
+    queue.put(out)
+
+def measure(repeat):
+    """Time the paths in a forked child so the big responses of one pass cannot skew the next."""
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(repeat, queue))
+    proc.start()
+    out = queue.get()
+    proc.join()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--expenses", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory(prefix="bench_archive_")
+    # end the history today so everything but the current year is closed
+    dataset = synthetic.generate(scratch.name, households=1, members=4, expenses=args.expenses,
+                                 days=args.years * 365, seed=7)
+    from app import app
+    import archive
+
+    db_path = os.path.join(scratch.name, "expenses.db")
+    before = measure(args.repeat)
+    before_size = os.path.getsize(db_path)
+
+    t0 = time.perf_counter()
+    moved = 0
+    with app.app_context():
+        for hid, year in archive.closed_years(date.today().year):
+            moved += archive.archive_year(hid, year)
+        from extensions import db
+        db.engine.dispose()
+    con = sqlite3.connect(db_path)
+    con.execute("VACUUM")
+    con.execute("ANALYZE")
+    con.close()
+    archive_s = time.perf_counter() - t0
+    after = measure(args.repeat)
+
+    archive_bytes = sum(os.path.getsize(os.path.join(d, f))
+                        for d, _, files in os.walk(os.path.join(scratch.name, "archive")) for f in files)
+    print(json.dumps({"years": args.years, "expenses": dataset["total_expenses"], "archived": moved,
+                      "archive_s": round(archive_s, 2),
+                      "db_mb_before": round(before_size / 2 ** 20, 1),
+                      "db_mb_after": round(os.path.getsize(db_path) / 2 ** 20, 1),
+                      "snapshot_mb": round(archive_bytes / 2 ** 20, 1),
+                      "median_ms_before": before, "median_ms_after": after}, indent=2))
+    scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
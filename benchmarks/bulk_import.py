@@ -0,0 +1,52 @@
+"""Bulk import throughput: POST /api/expenses/import vs one POST /api/expense per row.
+
+Runs in-process through the Flask test client against a scratch SQLite database. Usage:
+
+    python benchmarks/bulk_import.py [--rows 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory(prefix="bench_import_")
+    os.environ["DATA_DIR"] = os.environ["REPORTS_DIR"] = scratch.name
+    sys.path.insert(0, ROOT)
+    from app import app
+
+    client = app.test_client()
+    client.post("/auth/register", data={"email": "bench@example.com", "password": "pw", "display_name": "Bench"})
+    rows = [{"item": f"item {i}", "amount": 10 + i % 50, "category": "food",
+             "date": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", "time": f"{i % 24:02d}:{i % 60:02d}"}
+            for i in range(args.rows)]
+
+    t0 = time.perf_counter()
+    for row in rows:
+        assert client.post("/api/expense", json=row).status_code == 200
+    single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    r = client.post("/api/expenses/import", json=rows)
+    bulk = time.perf_counter() - t0
+    assert r.status_code == 200 and r.get_json()["imported"] == args.rows, r.get_data(as_text=True)
+
+    results = {"rows": args.rows,
+               "single_rows_per_s": round(args.rows / single, 1),
+               "bulk_rows_per_s": round(args.rows / bulk, 1),
+               "speedup": round(single / bulk, 1)}
+    print(json.dumps(results, indent=2))
+    scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
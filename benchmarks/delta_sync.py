@@ -0,0 +1,80 @@
+"""Delta sync benchmark: full /api/expenses reload vs /api/expenses/changes after one new expense.
+
+Seeds a household with N expenses in a scratch database, then for each of several rounds adds
+one expense and measures bytes transferred and server time for both ways of refreshing. Usage:
+
+    python benchmarks/delta_sync.py [--expenses 50000] [--rounds 5]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(db_path, n):
+    con = sqlite3.connect(db_path)
+    con.executemany("INSERT INTO expense (id, item, amount, payer_id, household_id, category, date, time) "
+                    "VALUES (?, ?, ?, 1, 1, 'food', ?, '12:00:00.000000')",
+                    [(i, f"item {i}", 10 + i % 90, f"20{20 + i % 5}-{1 + i % 12:02d}-{1 + i % 28:02d}")
+                     for i in range(1, n + 1)])
+    con.executemany("INSERT INTO split (expense_id, user_id, share_amount) VALUES (?, 1, ?)",
+                    [(i, 10 + i % 90) for i in range(1, n + 1)])
+    con.commit()
+    con.close()
+
+
+def timed(client, url):
+    t0 = time.perf_counter()
+    r = client.get(url)
+    elapsed = time.perf_counter() - t0
+    assert r.status_code == 200, r.status_code
+    return r, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--expenses", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory(prefix="bench_delta_")
+    os.environ["DATA_DIR"] = os.environ["REPORTS_DIR"] = scratch.name
+    sys.path.insert(0, ROOT)
+    from app import app
+    import aggregates
+
+    client = app.test_client()
+    client.post("/auth/register", data={"email": "bench@example.com", "password": "pw", "display_name": "Bench"})
+    seed(os.path.join(scratch.name, "expenses.db"), args.expenses)
+    with app.app_context():
+        aggregates.rebuild()
+
+    seq = client.get("/api/expenses").get_json()["seq"]
+    full_bytes, full_time, delta_bytes, delta_time = [], [], [], []
+    for i in range(args.rounds):
+        client.post("/api/expense", json={"item": f"round {i}", "amount": 5})
+        r, t = timed(client, "/api/expenses")
+        full_bytes.append(len(r.data))
+        full_time.append(t)
+        r, t = timed(client, f"/api/expenses/changes?since={seq}")
+        delta_bytes.append(len(r.data))
+        delta_time.append(t)
+        seq = r.get_json()["seq"]
+
+    results = {"expenses": args.expenses, "rounds": args.rounds,
+               "full_bytes": int(statistics.median(full_bytes)),
+               "full_ms": round(statistics.median(full_time) * 1000, 1),
+               "delta_bytes": int(statistics.median(delta_bytes)),
+               "delta_ms": round(statistics.median(delta_time) * 1000, 2)}
+    print(json.dumps(results, indent=2))
+    scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
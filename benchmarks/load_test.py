@@ -0,0 +1,305 @@
+"""Load test for the main endpoints against a synthetic dataset.
+
+Generates households with benchmarks/synthetic.py (or reuses --data-dir), then drives a
+weighted mix of /dashboard, /api/expenses, /api/budget, POST /api/expense and
+/api/report/<period> either through the Flask test client (one process per virtual user) or
+through a local gunicorn (one thread per virtual user). Writes per-endpoint p50/p95/p99
+latency, throughput, SQL query counts and peak RSS as JSON. Under gunicorn, query counts come from
+the Server-Timing header, so start it with METRICS_ENABLED=1 to get them. Usage:
+
+    python benchmarks/load_test.py [--mode client|gunicorn] [--users 4] [--seconds 10]
+                                   [--mix dashboard=1,expenses=4,budget=3,expense=1,report=1]
+                                   [--period monthly] [--report-format csv|xlsx]
+                                   [--data-dir DIR] [--out results.json] [synthetic options]
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import re
+import resource
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import synthetic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "dashboard=1,expenses=4,budget=3,expense=1,report=1"
+
+
+def endpoints(period, report_format):
+    report = f"/api/report/{period}" + ("?format=csv" if report_format == "csv" else "")
+    return {
+        "dashboard": ("GET", "/dashboard"),
+        "expenses": ("GET", "/api/expenses?limit=100"),
+        "budget": ("GET", "/api/budget"),
+        "expense": ("POST", "/api/expense"),
+        "report": ("GET", report),
+    }
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def expense_body(rnd):
+    return {"item": f"load {rnd.randrange(10 ** 6)}", "amount": round(rnd.uniform(1, 200), 2),
+            "category": rnd.choice(synthetic.CATEGORIES[:4])}
+
+def user_for(index, households, members):
+    hid = households[index % len(households)]
+    return synthetic.member_email(hid, (index // len(households)) % members)
+
+
+def _schedule(cfg, index):
+    rnd = random.Random(cfg["seed"] * 1000 + index)
+    names = list(cfg["mix"])
+    weights = [cfg["mix"][n] for n in names]
+    return rnd, lambda: rnd.choices(names, weights)[0]
+
+
+# ---------- test client mode ----------
+def client_worker(index, cfg, queue):
+    os.environ["DATA_DIR"] = cfg["data_dir"]
+    os.environ["REPORTS_DIR"] = os.path.join(cfg["data_dir"], "reports")
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import event
+    from app import app
+    from extensions import db
+
+    with app.app_context():
+        engine = db.engine
+    engine.dispose(close=False)
+    queries = [0]
+    event.listen(engine, "before_cursor_execute", lambda *a: queries.__setitem__(0, queries[0] + 1))
+
+    client = app.test_client()
+    client.post("/auth/login", data={"email": cfg["email"][index], "password": synthetic.PASSWORD})
+    routes = cfg["endpoints"]
+    rnd, pick = _schedule(cfg, index)
+
+    def call(name):
+        method, path = routes[name]
+        if method == "POST":
+            return client.post(path, json=expense_body(rnd))
+        r = client.get(path)
+        r.get_data()  # drain streamed responses inside the timing
+        return r
+
+    for name in routes:
+        for _ in range(cfg["warmup"]):
+            call(name)
+    samples = []
+    deadline = time.perf_counter() + cfg["seconds"]
+    while time.perf_counter() < deadline:
+        name = pick()
+        queries[0] = 0
+        t0 = time.perf_counter()
+        r = call(name)
+        samples.append((name, (time.perf_counter() - t0) * 1000, r.status_code, queries[0]))
+    queue.put({"samples": samples, "rss_kb": [resource.getrusage(resource.RUSAGE_SELF).ru_maxrss]})
+
+def run_client(cfg):
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=client_worker, args=(i, cfg, queue)) for i in range(cfg["users"])]
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return results
+
+
+# ---------- gunicorn mode ----------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _peak_rss_kb(pid):
+    """VmHWM (peak resident set) of pid and its children, from /proc. Linux only."""
+    out = []
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as fh:
+            pids += [int(p) for p in fh.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as fh:
+                out += [int(line.split()[1]) for line in fh if line.startswith("VmHWM:")]
+        except OSError:
+            pass
+    return out
+
+def _wait_healthy(base, proc, timeout=30):
+    import requests
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("gunicorn exited during startup")
+        try:
+            if requests.get(base + "/healthz", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            time.sleep(0.1)
+    raise SystemExit("gunicorn did not become healthy")
+
+def _timing_queries(response):
+    # query count from the Server-Timing header, present when the server runs with METRICS_ENABLED=1
+    header = response.headers.get("Server-Timing", "")
+    m = re.search(r'desc="(\d+) queries"', header)
+    return int(m.group(1)) if m else None
+
+def http_worker(index, cfg, base, out):
+    import requests
+    session = requests.Session()
+    session.post(base + "/auth/login", data={"email": cfg["email"][index], "password": synthetic.PASSWORD})
+    routes = cfg["endpoints"]
+    rnd, pick = _schedule(cfg, index)
+
+    def call(name):
+        method, path = routes[name]
+        if method == "POST":
+            return session.post(base + path, json=expense_body(rnd))
+        return session.get(base + path)
+
+    for name in routes:
+        for _ in range(cfg["warmup"]):
+            call(name)
+    samples = []
+    deadline = time.perf_counter() + cfg["seconds"]
+    while time.perf_counter() < deadline:
+        name = pick()
+        t0 = time.perf_counter()
+        r = call(name)
+        samples.append((name, (time.perf_counter() - t0) * 1000, r.status_code, _timing_queries(r)))
+    out.append({"samples": samples})
+
+def run_gunicorn(cfg):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATA_DIR=cfg["data_dir"], REPORTS_DIR=os.path.join(cfg["data_dir"], "reports"))
+    env.pop("RENDER", None)
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-w", str(cfg["workers"]), "-b", f"127.0.0.1:{port}",
+                             "--log-level", "warning", "app:app"], cwd=ROOT, env=env)
+    try:
+        _wait_healthy(base, proc)
+        results = []
+        threads = [threading.Thread(target=http_worker, args=(i, cfg, base, results)) for i in range(cfg["users"])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        rss = _peak_rss_kb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait()
+    if results:
+        results[0]["rss_kb"] = rss
+    return results
+
+
+# ---------- summary ----------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)  # nearest rank
+    return round(sorted_values[k], 2)
+
+def summarize(results, seconds):
+    by_name = {}
+    for res in results:
+        for name, ms, status, queries in res["samples"]:
+            by_name.setdefault(name, []).append((ms, status, queries))
+    out, total, errors = {}, 0, 0
+    for name, rows in sorted(by_name.items()):
+        lat = sorted(ms for ms, _, _ in rows)
+        q = [n for _, _, n in rows if n is not None]
+        errs = sum(1 for _, status, _ in rows if status >= 400)
+        out[name] = {"requests": len(rows), "errors": errs, "rps": round(len(rows) / seconds, 1),
+                     "p50_ms": percentile(lat, 50), "p95_ms": percentile(lat, 95), "p99_ms": percentile(lat, 99),
+                     "max_ms": round(lat[-1], 2),
+                     "queries_mean": round(sum(q) / len(q), 2) if q else None,
+                     "queries_max": max(q) if q else None}
+        total += len(rows)
+        errors += errs
+    rss = [kb for res in results for kb in res.get("rss_kb", [])]
+    overall = {"requests": total, "errors": errors, "rps": round(total / seconds, 1),
+               "peak_rss_mb": round(max(rss) / 1024, 1) if rss else None,
+               "peak_rss_total_mb": round(sum(rss) / 1024, 1) if rss else None}
+    return out, overall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("client", "gunicorn"), default="client")
+    parser.add_argument("--users", type=int, default=4, help="concurrent virtual users")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers (gunicorn mode)")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=int, default=1, help="untimed calls per endpoint and user")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--period", default="monthly")
+    parser.add_argument("--report-format", choices=("csv", "xlsx"), default="csv")
+    parser.add_argument("--data-dir", help="reuse a dataset made by synthetic.py instead of generating one")
+    parser.add_argument("--out", help="also write the JSON result to this file")
+    synthetic.add_arguments(parser)
+    args = parser.parse_args()
+
+    scratch = None
+    if args.data_dir:
+        data_dir = os.path.abspath(args.data_dir)
+        con = sqlite3.connect(os.path.join(data_dir, "expenses.db"))
+        households = [r[0] for r in con.execute("SELECT id FROM household ORDER BY id")]
+        con.close()
+        dataset = {"data_dir": data_dir, "reused": True, "household_ids": households}
+    else:
+        scratch = tempfile.TemporaryDirectory(prefix="bench_load_")
+        data_dir = scratch.name
+        dataset = synthetic.generate_from_args(data_dir, args)
+        households = dataset["household_ids"]
+
+    routes = endpoints(args.period, args.report_format)
+    mix = parse_mix(args.mix)
+    unknown = set(mix) - set(routes)
+    if unknown:
+        parser.error(f"unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    cfg = {"data_dir": data_dir, "users": args.users, "workers": args.workers, "seconds": args.seconds,
+           "warmup": args.warmup, "seed": args.seed, "mix": mix,
+           "endpoints": {n: routes[n] for n in mix},
+           "email": [user_for(i, households, args.members) for i in range(args.users)]}
+
+    t0 = time.perf_counter()
+    results = run_client(cfg) if args.mode == "client" else run_gunicorn(cfg)
+    wall = time.perf_counter() - t0
+    per_endpoint, overall = summarize(results, args.seconds)
+
+    report = {"mode": args.mode, "users": args.users, "seconds": args.seconds, "wall_s": round(wall, 2),
+              "mix": mix, "period": args.period, "report_format": args.report_format,
+              "python": platform.python_version(), "dataset": dataset,
+              "overall": overall, "endpoints": per_endpoint}
+    if args.mode == "gunicorn":
+        report["workers"] = args.workers
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    if scratch:
+        scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
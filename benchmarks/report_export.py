@@ -0,0 +1,117 @@
+"""Report export benchmark: streaming write-only engine vs the previous pandas path.
+
+Each (engine, size) pair runs in a fresh subprocess against a scratch SQLite database so
+peak RSS (ru_maxrss) is measured per run. Usage:
+
+    python benchmarks/report_export.py [--sizes 10000,100000,1000000] [--engines stream,pandas]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEMBERS = 4
+
+
+def seed(data_dir, n):
+    """Create the schema through the app, then bulk-load n expenses with raw sqlite3."""
+    env = dict(os.environ, DATA_DIR=data_dir)
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app", "db-upgrade"], cwd=ROOT, env=env, check=True)
+    con = sqlite3.connect(os.path.join(data_dir, "expenses.db"))
+    con.execute("INSERT INTO household (id, name, invite_code, budget) VALUES (1, 'bench', 'bench001', 50000)")
+    con.executemany("INSERT INTO user (id, email, display_name, household_id, is_active, is_admin) VALUES (?, ?, ?, 1, 1, ?)",
+                    [(i, f"member{i}@bench", f"Member {i}", i == 1) for i in range(1, MEMBERS + 1)])
+    rnd = random.Random(n)
+    first = date(2020, 1, 1)
+    categories = ["food", "rent", "utilities", "travel", None]
+    batch = []
+    for i in range(1, n + 1):
+        payer = rnd.randint(1, MEMBERS)
+        amount = round(rnd.uniform(1, 500), 2)
+        d = first + timedelta(days=rnd.randint(0, 5 * 365))
+        t = f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:00.000000"
+        batch.append((i, f"item {i}", amount, payer, rnd.choice(categories), d.isoformat(), t, payer))
+        if len(batch) == 50000 or i == n:
+            con.executemany("INSERT INTO expense (id, item, amount, payer_id, household_id, category, date, time) "
+                            "VALUES (?, ?, ?, ?, 1, ?, ?, ?)", [b[:7] for b in batch])
+            con.executemany("INSERT INTO split (expense_id, user_id, share_amount) VALUES (?, ?, ?)",
+                            [(b[0], b[7], b[2]) for b in batch])
+            batch = []
+    con.commit()
+    con.close()
+
+
+def legacy_pandas_report(path, household_id, budget):
+    """The pre-streaming export: build every row in memory, then DataFrame -> ExcelWriter."""
+    import pandas as pd
+    from models import Expense
+    from queries import load_expenses, expense_to_report_row
+    q = Expense.query.filter_by(household_id=household_id)
+    expenses, splits, users = load_expenses(q.order_by(Expense.date.asc(), Expense.time.asc()))
+    rows = [expense_to_report_row(e, splits.get(e.id, []), users) for e in expenses]
+    total_spent = sum(float(e.amount) for e in expenses)
+    df = pd.DataFrame(rows)
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name="Expenses", index=False)
+        summary = pd.DataFrame([{"Metric": "Budget", "Value": budget}, {"Metric": "Total Spent", "Value": total_spent},
+                                {"Metric": "Remaining", "Value": budget - total_spent}])
+        summary.to_excel(writer, sheet_name="Summary", index=False)
+
+
+def child(engine, out_dir):
+    sys.path.insert(0, ROOT)
+    import app as appmod
+    import reports
+    path = os.path.join(out_dir, f"bench_{engine}.{'csv' if engine == 'csv' else 'xlsx'}")
+    with appmod.app.app_context():
+        base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        t0 = time.perf_counter()
+        if engine == "pandas":
+            legacy_pandas_report(path, 1, 50000.0)
+        elif engine == "stream":
+            reports.write_xlsx(path, 1, 50000.0)
+        else:
+            with open(path, "w", newline="") as fh:
+                for chunk in reports.iter_csv(1):
+                    fh.write(chunk)
+        wall = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"wall_s": round(wall, 3), "peak_rss_mb": round(peak / 1024, 1),
+                      "delta_rss_mb": round((peak - base_rss) / 1024, 1), "bytes": os.path.getsize(path)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--engines", default="stream,csv,pandas")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, os.environ["DATA_DIR"])
+        return
+
+    results = []
+    for n in [int(s) for s in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory(prefix="bench_report_") as data_dir:
+            seed(data_dir, n)
+            for engine in args.engines.split(","):
+                env = dict(os.environ, DATA_DIR=data_dir, REPORTS_DIR=data_dir)
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", engine],
+                                     cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+                res = dict(json.loads(out.stdout.strip().splitlines()[-1]), engine=engine, expenses=n)
+                results.append(res)
+                print(f"{n:>9} {engine:<7} wall {res['wall_s']:>8.2f}s  peak RSS {res['peak_rss_mb']:>8.1f} MB "
+                      f"(+{res['delta_rss_mb']} MB)")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
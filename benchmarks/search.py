@@ -0,0 +1,106 @@
+"""Full-text search benchmark: /api/expenses/search latency on a large household.
+
+Generates households with benchmarks/synthetic.py, then times a set of searches (short and
+long prefixes, several words, filters, later pages) against the first household, plus a full
+index rebuild. Reports the median and p95 per search, for search.search() alone and for the
+whole request. Usage:
+
+    python benchmarks/search.py [--households 2] [--expenses 300000] [--repeat 50]
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import synthetic
+
+SEARCHES = {
+    "one_letter": {"q": "p"},
+    "short_prefix": {"q": "coff"},
+    "whole_word": {"q": "coffee"},
+    "long_word": {"q": "supermarket"},
+    "two_words": {"q": "wine air"},
+    "category": {"q": "groceries"},
+    "no_match": {"q": "zzzz"},
+    "filtered": {"q": "taxi", "min_amount": 20, "max_amount": 80, "payer_id": 1},
+    "date_range": {"q": "lunch", "start": "{recent}"},
+    "page_5": {"q": "bread", "limit": 50, "page": 5},
+}
+
+
+def percentile(sorted_values, pct):
+    k = max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)
+    return round(sorted_values[k], 2)
+
+def summary(samples):
+    samples.sort()
+    return {"median_ms": round(statistics.median(samples), 2), "p95_ms": percentile(samples, 95)}
+
+def index_mb(db_path):
+    con = sqlite3.connect(db_path)
+    try:
+        size = con.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'expense_fts%'").fetchone()[0]
+    except sqlite3.OperationalError:  # dbstat not compiled in
+        size = None
+    con.close()
+    return round(size / 2 ** 20, 1) if size else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--households", type=int, default=2)
+    parser.add_argument("--expenses", type=int, default=300000, help="expenses per household")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory(prefix="bench_search_")
+    dataset = synthetic.generate(scratch.name, households=args.households, members=4, expenses=args.expenses, seed=11)
+    from datetime import date, timedelta
+    from app import app
+    import search
+
+    recent = (date.today() - timedelta(days=90)).isoformat()
+    client = app.test_client()
+    client.post("/auth/login", data={"email": synthetic.member_email(1, 0), "password": synthetic.PASSWORD})
+    hid = dataset["household_ids"][0]
+    results = {}
+    with app.app_context():
+        for name, params in SEARCHES.items():
+            params = {k: v.format(recent=recent) if isinstance(v, str) else v for k, v in params.items()}
+            limit, page = params.pop("limit", 20), params.pop("page", 1)
+            kwargs = dict(params, start=date.fromisoformat(params["start"]) if "start" in params else None)
+            offset = (page - 1) * limit
+            cursor = search.encode_cursor(offset) if offset else None
+            url_params = dict(params, limit=limit, **({"cursor": cursor} if cursor else {}))
+
+            fn_ms, http_ms = [], []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                expenses, _, _, _, complete = search.search(hid, limit=limit, offset=offset, **kwargs)
+                fn_ms.append((time.perf_counter() - t0) * 1000)
+                t0 = time.perf_counter()
+                r = client.get("/api/expenses/search", query_string=url_params)
+                r.get_data()
+                http_ms.append((time.perf_counter() - t0) * 1000)
+                assert r.status_code == 200, (name, r.status_code)
+            results[name] = {"hits": len(expenses), "ranking_complete": complete,
+                             "search": summary(fn_ms), "request": summary(http_ms)}
+
+        t0 = time.perf_counter()
+        indexed = search.rebuild()
+        rebuild_s = time.perf_counter() - t0
+        problems = search.verify()
+
+    print(json.dumps({"households": args.households, "expenses_per_household": args.expenses,
+                      "indexed": indexed, "rebuild_s": round(rebuild_s, 2), "verify_problems": len(problems),
+                      "index_mb": index_mb(os.path.join(scratch.name, "expenses.db")),
+                      "searches": results}, indent=2))
+    scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
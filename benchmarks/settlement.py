@@ -0,0 +1,88 @@
+"""Settlement benchmark: balance aggregate + greedy transfers for large households.
+
+Seeds a scratch SQLite database with raw sqlite3 (expenses split across random participants),
+then times household_settlement() cold and from the version cache. Usage:
+
+    python benchmarks/settlement.py [--expenses 5000,50000] [--members 12,48]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(db_path, household_id, members, expenses, first_user_id):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO household (id, name, invite_code, budget) VALUES (?, ?, ?, 0)",
+                (household_id, f"bench {household_id}", f"bench{household_id:03d}"))
+    uids = list(range(first_user_id, first_user_id + members))
+    con.executemany("INSERT INTO user (id, email, display_name, household_id, is_active, is_admin) VALUES (?, ?, ?, ?, 1, 0)",
+                    [(u, f"m{u}@bench", f"Member {u}", household_id) for u in uids])
+    rnd = random.Random(household_id)
+    exp_rows, split_rows = [], []
+    next_id = con.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM expense").fetchone()[0]
+    for eid in range(next_id, next_id + expenses):
+        amount = round(rnd.uniform(5, 500), 2)
+        payer = rnd.choice(uids)
+        exp_rows.append((eid, f"item {eid}", amount, payer, household_id, "2024-01-01", "12:00:00.000000"))
+        parts = rnd.sample(uids, rnd.randint(1, min(6, members)))
+        share = round(amount / len(parts), 2)
+        for i, u in enumerate(parts):
+            split_rows.append((eid, u, share if i else round(amount - share * (len(parts) - 1), 2)))
+    con.executemany("INSERT INTO expense (id, item, amount, payer_id, household_id, date, time) VALUES (?, ?, ?, ?, ?, ?, ?)", exp_rows)
+    con.executemany("INSERT INTO split (expense_id, user_id, share_amount) VALUES (?, ?, ?)", split_rows)
+    con.commit()
+    con.close()
+    return len(split_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--expenses", default="5000,50000")
+    parser.add_argument("--members", default="12,48")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory(prefix="bench_settle_")
+    os.environ["DATA_DIR"] = os.environ["REPORTS_DIR"] = scratch.name
+    sys.path.insert(0, ROOT)
+    from app import app
+    import migrations
+    import settlement
+
+    with app.app_context():
+        migrations.ensure_schema()
+
+    results = []
+    household_id, next_user = 1, 1
+    for n in [int(x) for x in args.expenses.split(",")]:
+        for m in [int(x) for x in args.members.split(",")]:
+            splits = seed(os.path.join(scratch.name, "expenses.db"), household_id, m, n, next_user)
+            with app.app_context():
+                cold = []
+                for _ in range(args.repeat):
+                    settlement._cache.clear()
+                    t0 = time.perf_counter()
+                    out = settlement.household_settlement(household_id)
+                    cold.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                settlement.household_settlement(household_id)
+                warm = time.perf_counter() - t0
+            res = {"expenses": n, "members": m, "splits": splits, "transfers": len(out["transfers"]),
+                   "cold_ms": round(min(cold) * 1000, 2), "cached_ms": round(warm * 1000, 3)}
+            results.append(res)
+            print(res)
+            household_id += 1
+            next_user += m
+    print(json.dumps(results, indent=2))
+    scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Concurrency stress test for the SQLite engine profile.
+
+Several processes, each with its own app instance and logged-in member, hammer one scratch
+database with a read/write mix for a fixed duration. Reports throughput and error counts.
+Usage:
+
+    python benchmarks/sqlite_concurrency.py [--procs 6] [--seconds 10] [--write-ratio 0.3]
+                                            [--journal-mode WAL|DELETE] [--retries 4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _app():
+    sys.path.insert(0, ROOT)
+    from app import app
+    return app
+
+
+def setup(procs):
+    app = _app()
+    client = app.test_client()
+    client.post("/auth/register", data={"email": "owner@bench", "password": "pw", "display_name": "Owner"})
+    with app.app_context():
+        from models import Household
+        invite = Household.query.first().invite_code
+    for i in range(1, procs):
+        app.test_client().post("/auth/register", data={"email": f"member{i}@bench", "password": "pw",
+                                                        "display_name": f"Member {i}", "invite_code": invite})
+
+
+def worker(index, seconds, write_ratio, queue):
+    app = _app()
+    client = app.test_client()
+    email = "owner@bench" if index == 0 else f"member{index}@bench"
+    client.post("/auth/login", data={"email": email, "password": "pw"})
+    rnd = random.Random(index)
+    stats = {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if rnd.random() < write_ratio:
+            kind = "write"
+            r = client.post("/api/expense", json={"item": f"p{index}", "amount": rnd.randint(1, 100)})
+        else:
+            kind = "read"
+            r = client.get(rnd.choice(["/api/expenses?limit=50", "/api/budget", "/api/members"]))
+        stats[kind + "s"] += 1
+        if r.status_code >= 500:
+            stats[kind + "_errors"] += 1
+    queue.put(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procs", type=int, default=6)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--journal-mode", default="WAL")
+    parser.add_argument("--retries", type=int, default=None)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory(prefix="bench_sqlite_")
+    os.environ["DATA_DIR"] = os.environ["REPORTS_DIR"] = scratch.name
+    os.environ["SQLITE_JOURNAL_MODE"] = args.journal_mode
+    if args.retries is not None:
+        os.environ["SQLITE_WRITE_RETRIES"] = str(args.retries)
+
+    ctx = multiprocessing.get_context("spawn")
+    setup_proc = ctx.Process(target=setup, args=(args.procs,))
+    setup_proc.start()
+    setup_proc.join()
+
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(i, args.seconds, args.write_ratio, queue)) for i in range(args.procs)]
+    for p in procs:
+        p.start()
+    totals = {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+    for _ in procs:
+        for k, v in queue.get().items():
+            totals[k] += v
+    for p in procs:
+        p.join()
+
+    ops = totals["reads"] + totals["writes"]
+    print(json.dumps(dict(totals, procs=args.procs, seconds=args.seconds, journal_mode=args.journal_mode,
+                          ops_per_s=round(ops / args.seconds, 1)), indent=2))
+    scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Cold start benchmark: module import time and time to first response in a fresh interpreter.
+
+Each run starts a new Python process against a scratch DATA_DIR, imports app and issues one
+request with the test client. The first run sees an empty data directory (schema is created);
+later runs reuse it, which is the normal case for a restarted worker. Exits non-zero when the
+median exceeds the thresholds, so it can gate a deploy. Usage:
+
+    python benchmarks/startup.py [--runs 5] [--path /healthz] [--max-import-ms 900] [--max-first-ms 1200]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from app import app
+t1 = time.perf_counter()
+status = app.test_client().get(sys.argv[1]).status_code
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_ms": (t2 - t0) * 1000, "status": status,
+                  "heavy": sorted(m for m in ("pandas", "openpyxl", "flask_dance", "requests") if m in sys.modules)}))
+"""
+
+
+def probe(data_dir, path):
+    env = dict(os.environ, DATA_DIR=data_dir, REPORTS_DIR=os.path.join(data_dir, "reports"))
+    env.pop("RENDER", None)
+    out = subprocess.run([sys.executable, "-c", PROBE, path], cwd=ROOT, env=env,
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/healthz")
+    parser.add_argument("--max-import-ms", type=float, default=900.0)
+    parser.add_argument("--max-first-ms", type=float, default=1200.0)
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory()
+    cold = probe(scratch.name, "/auth/login")  # creates the schema and the marker
+    runs = [probe(scratch.name, args.path) for _ in range(args.runs)]
+
+    results = {"path": args.path, "runs": args.runs,
+               "first_boot_ms": round(cold["first_ms"], 1),
+               "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+               "first_response_ms": round(statistics.median(r["first_ms"] for r in runs), 1),
+               "status": runs[-1]["status"],
+               "heavy_modules_loaded": runs[-1]["heavy"],
+               "max_import_ms": args.max_import_ms, "max_first_ms": args.max_first_ms}
+    print(json.dumps(results, indent=2))
+    scratch.cleanup()
+    if results["import_ms"] > args.max_import_ms or results["first_response_ms"] > args.max_first_ms:
+        print("startup regression: threshold exceeded", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Synthetic household generator for benchmarks and load tests.
+
+Creates the schema through the app, then bulk-loads households with raw sqlite3 so large
+datasets take seconds rather than minutes. Output is fully determined by the parameters and
+--seed. Every member can log in as m<member>.h<household>@bench with password "pw". Usage:
+
+    python benchmarks/synthetic.py DATA_DIR [--households 1] [--members 4] [--expenses 10000]
+                                   [--splits 2] [--days 365] [--categories 8] [--skew 1.2] [--seed 1]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "pw"
+CATEGORIES = ["food", "rent", "utilities", "transport", "groceries", "fun", "health", "travel",
+              "gifts", "household", "pets", "misc"]
+# item text is "<thing> <place>" so full-text search has realistic, repeating words to match
+THINGS = ["coffee", "lunch", "dinner", "bread", "milk", "taxi", "bus ticket", "petrol", "cinema", "books",
+          "shoes", "pharmacy", "vet", "cleaning supplies", "electricity", "internet", "water bill", "flowers",
+          "birthday present", "hotel", "train", "pizza", "wine", "vegetables"]
+PLACES = ["corner shop", "supermarket", "market", "online", "station", "downtown", "airport", "mall"]
+BATCH = 20000
+
+
+def member_email(household_id, index):
+    return f"m{index}.h{household_id}@bench"
+
+
+def _weights(n, skew):
+    # Zipf-like: category k gets weight 1 / k**skew, so skew=0 is uniform
+    return [1.0 / (k ** skew) for k in range(1, n + 1)]
+
+
+def _create_schema(data_dir):
+    os.environ["DATA_DIR"] = data_dir
+    os.environ.setdefault("REPORTS_DIR", os.path.join(data_dir, "reports"))
+    sys.path.insert(0, ROOT)
+    from app import app
+    import migrations
+    with app.app_context():
+        migrations.ensure_schema()
+    return app
+
+
+def _rebuild_rollups(app):
+    import aggregates
+    import analytics
+    from extensions import db
+    with app.app_context():
+        aggregates.rebuild()
+        analytics.rebuild()
+    with app.app_context():
+        db.engine.dispose()
+
+
+def generate(data_dir, households=1, members=4, expenses=10000, splits=2, days=365,
+             categories=8, skew=1.2, budget=50000.0, seed=1, end=None):
+    """Fill data_dir/expenses.db with synthetic households. Returns a summary dict.
+
+    expenses is per household; splits is the number of members sharing each expense (capped at
+    members). Dates are spread uniformly over the `days` days ending at `end` (default today).
+    """
+    from werkzeug.security import generate_password_hash
+
+    app = _create_schema(data_dir)
+    rnd = random.Random(seed)
+    end = end or date.today()
+    first_day = end - timedelta(days=days - 1)
+    cats = CATEGORIES[:max(1, min(categories, len(CATEGORIES)))]
+    weights = _weights(len(cats), skew)
+    pw_hash = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+    splits = max(1, min(splits, members))
+
+    t0 = time.perf_counter()
+    con = sqlite3.connect(os.path.join(data_dir, "expenses.db"))
+    con.execute("PRAGMA synchronous=OFF")
+    hh_start = (con.execute("SELECT COALESCE(MAX(id), 0) FROM household").fetchone()[0]) + 1
+    user_id = (con.execute("SELECT COALESCE(MAX(id), 0) FROM user").fetchone()[0]) + 1
+    expense_id = (con.execute("SELECT COALESCE(MAX(id), 0) FROM expense").fetchone()[0]) + 1
+    n_splits = 0
+    for hid in range(hh_start, hh_start + households):
+        uids = list(range(user_id, user_id + members))
+        user_id += members
+        con.execute("INSERT INTO household (id, name, invite_code, budget, created_by) VALUES (?, ?, ?, ?, ?)",
+                    (hid, f"bench {hid}", f"bench{hid:04d}", budget, uids[0]))
+        con.executemany("INSERT INTO user (id, email, password_hash, display_name, household_id, is_active, is_admin) "
+                        "VALUES (?, ?, ?, ?, ?, 1, ?)",
+                        [(uid, member_email(hid, i), pw_hash, f"Member {i}", hid, int(i == 0))
+                         for i, uid in enumerate(uids)])
+        remaining = expenses
+        while remaining:
+            n = min(BATCH, remaining)
+            remaining -= n
+            exp_rows, split_rows = [], []
+            for _ in range(n):
+                amount = round(rnd.lognormvariate(3.0, 0.8), 2)
+                day = first_day + timedelta(days=rnd.randrange(days))
+                exp_rows.append((expense_id, f"{rnd.choice(THINGS)} {rnd.choice(PLACES)}", amount, rnd.choice(uids), hid,
+                                 rnd.choices(cats, weights)[0], day.isoformat(),
+                                 f"{rnd.randrange(24):02d}:{rnd.randrange(60):02d}:00.000000"))
+                share = round(amount / splits, 2)
+                people = rnd.sample(uids, splits)
+                for j, uid in enumerate(people):
+                    # the last share absorbs rounding so shares add up to the amount
+                    split_rows.append((expense_id, uid, round(amount - share * (splits - 1), 2) if j == splits - 1 else share))
+                expense_id += 1
+            con.executemany("INSERT INTO expense (id, item, amount, payer_id, household_id, category, date, time) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", exp_rows)
+            con.executemany("INSERT INTO split (expense_id, user_id, share_amount) VALUES (?, ?, ?)", split_rows)
+            n_splits += len(split_rows)
+        con.commit()
+    con.execute("ANALYZE")
+    con.close()
+    _rebuild_rollups(app)
+
+    return {"data_dir": data_dir, "households": households, "members": members,
+            "expenses_per_household": expenses, "splits_per_expense": splits, "days": days,
+            "categories": len(cats), "skew": skew, "seed": seed,
+            "household_ids": list(range(hh_start, hh_start + households)),
+            "total_expenses": households * expenses, "total_splits": n_splits,
+            "seconds": round(time.perf_counter() - t0, 2)}
+
+
+def add_arguments(parser):
+    parser.add_argument("--households", type=int, default=1)
+    parser.add_argument("--members", type=int, default=4)
+    parser.add_argument("--expenses", type=int, default=10000, help="per household")
+    parser.add_argument("--splits", type=int, default=2, help="members sharing each expense")
+    parser.add_argument("--days", type=int, default=365, help="date span ending today")
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--skew", type=float, default=1.2, help="Zipf exponent for categories; 0 = uniform")
+    parser.add_argument("--seed", type=int, default=1)
+
+def generate_from_args(data_dir, args):
+    return generate(data_dir, households=args.households, members=args.members, expenses=args.expenses,
+                    splits=args.splits, days=args.days, categories=args.categories, skew=args.skew,
+                    seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data_dir")
+    add_arguments(parser)
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+    print(json.dumps(generate_from_args(os.path.abspath(args.data_dir), args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
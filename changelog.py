@@ -0,0 +1,61 @@
+# changelog.py
+# Per-household change feed so clients can fetch only what changed since their last sync.
+# Write paths append one ExpenseChange row per touched expense in the same transaction:
+# 'upsert' for inserts and payer/split reassignments (and member renames that alter display
+# names), 'delete' tombstones for rows removed from the hot table.
+from datetime import datetime
+from sqlalchemy import func, insert, text
+from extensions import db
+from models import Expense, ExpenseChange
+from queries import load_expenses, expense_to_dict
+
+FEED_LIMIT = 1000
+
+
+def log_expenses(household_id, expense_ids, op="upsert"):
+    if not expense_ids:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(ExpenseChange), [
+        {"household_id": household_id, "expense_id": eid, "op": op, "created_at": now} for eid in expense_ids])
+
+def log_member_expenses(household_id, user_id):
+    """Record an upsert for every household expense the member paid for or shares in.
+
+    Must run before the member's rows are reassigned.
+    """
+    db.session.execute(text(
+        "INSERT INTO expense_change (household_id, expense_id, op, created_at) "
+        "SELECT household_id, id, 'upsert', :now FROM expense WHERE household_id = :hid AND "
+        "(payer_id = :uid OR id IN (SELECT expense_id FROM split WHERE user_id = :uid))"),
+        {"hid": household_id, "uid": user_id, "now": datetime.utcnow()})
+
+def latest_seq(household_id):
+    return db.session.query(func.coalesce(func.max(ExpenseChange.seq), 0)).filter(
+        ExpenseChange.household_id == household_id).scalar()
+
+def changes_since(household_id, since, limit=FEED_LIMIT):
+    """Collapse the household's changes after seq `since`.
+
+    Returns {"changes": [expense dicts], "deleted": [ids], "seq": last seq seen, "has_more": bool}.
+    """
+    rows = (db.session.query(ExpenseChange.seq, ExpenseChange.expense_id, ExpenseChange.op)
+            .filter(ExpenseChange.household_id == household_id, ExpenseChange.seq > since)
+            .order_by(ExpenseChange.seq).limit(limit).all())
+    last_op = {}
+    for _, expense_id, op in rows:
+        last_op[expense_id] = op
+    upsert_ids = [eid for eid, op in last_op.items() if op == "upsert"]
+    deleted = {eid for eid, op in last_op.items() if op == "delete"}
+
+    changes = []
+    if upsert_ids:
+        expenses, splits, users = load_expenses(
+            Expense.query.filter(Expense.household_id == household_id, Expense.id.in_(upsert_ids)))
+        found = set()
+        for e in expenses:
+            found.add(e.id)
+            changes.append(expense_to_dict(e, splits.get(e.id, []), users))
+        deleted.update(set(upsert_ids) - found)
+    return {"changes": changes, "deleted": sorted(deleted),
+            "seq": rows[-1][0] if rows else since, "has_more": len(rows) == limit}
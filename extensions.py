@@ -1,3 +1,87 @@
+import functools
+import os
+import random
+import time
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
 
 db = SQLAlchemy()
+
+# ---------- SQLite engine profile ----------
+# Tuned for several gunicorn workers sharing one database file: WAL lets readers proceed while
+# a writer commits, busy_timeout makes writers wait for the lock instead of failing at once, and
+# with_write_retry() re-runs a write handler when the lock is still held after that.
+SQLITE_DEFAULTS = {
+    "SQLITE_JOURNAL_MODE": "WAL",
+    "SQLITE_SYNCHRONOUS": "NORMAL",          # safe with WAL; FULL fsyncs on every commit
+    "SQLITE_CACHE_SIZE": -20000,             # negative = KiB, so ~20 MB page cache per connection
+    "SQLITE_MMAP_SIZE": 128 * 1024 * 1024,
+    "SQLITE_BUSY_TIMEOUT": 5000,             # ms
+    "SQLITE_POOL_SIZE": 5,
+    "SQLITE_MAX_OVERFLOW": 10,
+    "SQLITE_WRITE_RETRIES": 4,
+    "SQLITE_RETRY_BACKOFF": 0.05,            # seconds, doubled per attempt plus jitter
+}
+
+
+def configure_sqlite(app):
+    """Fill SQLite settings from the environment and set engine options. Call before db.init_app(app)."""
+    for key, default in SQLITE_DEFAULTS.items():
+        app.config.setdefault(key, type(default)(os.environ.get(key, default)))
+    if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        return
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {
+        "connect_args": {"timeout": app.config["SQLITE_BUSY_TIMEOUT"] / 1000.0},
+        "pool_size": app.config["SQLITE_POOL_SIZE"],
+        "max_overflow": app.config["SQLITE_MAX_OVERFLOW"],
+        "pool_pre_ping": False,
+    })
+
+def init_sqlite(app):
+    """Apply the pragmas on every new connection. Call after db.init_app(app)."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+    cfg = app.config
+    pragmas = [
+        f"PRAGMA journal_mode={cfg['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={cfg['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size={int(cfg['SQLITE_CACHE_SIZE'])}",
+        f"PRAGMA mmap_size={int(cfg['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA busy_timeout={int(cfg['SQLITE_BUSY_TIMEOUT'])}",
+        "PRAGMA foreign_keys=OFF",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for sql in pragmas:
+            cur.execute(sql)
+        cur.close()
+
+
+def is_lock_error(exc):
+    msg = str(getattr(exc, "orig", exc)).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+def with_write_retry(fn):
+    """Re-run a write handler with exponential backoff when SQLite reports a transient lock.
+
+    The handler must do all of its writes in one transaction, so a failed attempt leaves nothing behind.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        retries = current_app.config.get("SQLITE_WRITE_RETRIES", 0)
+        backoff = current_app.config.get("SQLITE_RETRY_BACKOFF", 0.05)
+        for attempt in range(retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except OperationalError as exc:
+                db.session.rollback()
+                if attempt == retries or not is_lock_error(exc):
+                    raise
+                time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+    return wrapper
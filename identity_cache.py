@@ -0,0 +1,92 @@
+# identity_cache.py
+# Per-process TTL/LRU cache of User and Household rows for the Flask-Login user loader and the
+# household lookups most handlers start with. Cached rows are column snapshots; each hit is
+# re-attached to the current session with merge(load=False), which issues no SQL.
+#
+# Invalidation is explicit: write paths call invalidate_user()/invalidate_household() after
+# committing. Besides dropping the local entry, that touches a stamp file in DATA_DIR; every
+# worker compares the stamp's mtime on each lookup (one stat() call) and clears its whole cache
+# when it changes, so no worker keeps serving stale admin/active flags.
+import os
+import time
+from collections import OrderedDict
+from sqlalchemy.orm import make_transient_to_detached
+from extensions import db
+from models import User, Household
+
+_caches = {User: OrderedDict(), Household: OrderedDict()}
+_config = {"ttl": 60.0, "size": 1024, "stamp": None}
+_seen_stamp = None
+
+
+def init_app(app, data_dir):
+    app.config.setdefault("IDENTITY_CACHE_TTL", float(os.environ.get("IDENTITY_CACHE_TTL", 60)))
+    app.config.setdefault("IDENTITY_CACHE_SIZE", int(os.environ.get("IDENTITY_CACHE_SIZE", 1024)))
+    _config["ttl"] = app.config["IDENTITY_CACHE_TTL"]
+    _config["size"] = app.config["IDENTITY_CACHE_SIZE"]
+    _config["stamp"] = os.path.join(data_dir, ".identity_version")
+
+
+def _stamp_mtime():
+    try:
+        return os.stat(_config["stamp"]).st_mtime_ns
+    except (FileNotFoundError, TypeError):
+        return 0
+
+def _check_stamp():
+    global _seen_stamp
+    stamp = _stamp_mtime()
+    if stamp != _seen_stamp:
+        for cache in _caches.values():
+            cache.clear()
+        _seen_stamp = stamp
+
+def _touch_stamp():
+    path = _config["stamp"]
+    if not path:
+        return
+    now = time.time_ns()
+    with open(path, "a"):
+        pass
+    os.utime(path, ns=(now, now))
+
+
+def _get(model, pk):
+    if pk is None:
+        return None
+    _check_stamp()
+    cache = _caches[model]
+    hit = cache.get(pk)
+    if hit is not None and hit[0] > time.monotonic():
+        cache.move_to_end(pk)
+        obj = model(**hit[1])
+        make_transient_to_detached(obj)
+        return db.session.merge(obj, load=False)
+
+    obj = db.session.get(model, pk)
+    if obj is None:
+        cache.pop(pk, None)
+        return None
+    values = {c.key: getattr(obj, c.key) for c in model.__table__.columns}
+    cache[pk] = (time.monotonic() + _config["ttl"], values)
+    cache.move_to_end(pk)
+    while len(cache) > _config["size"]:
+        cache.popitem(last=False)
+    return obj
+
+def get_user(user_id):
+    return _get(User, user_id)
+
+def get_household(household_id):
+    return _get(Household, household_id)
+
+
+def invalidate_user(user_id):
+    """Call after committing a change to a user row."""
+    _caches[User].pop(user_id, None)
+    _touch_stamp()
+
+def invalidate_household(household_id):
+    """Call after committing a change to a household row."""
+    _caches[Household].pop(household_id, None)
+    _touch_stamp()
@@ -0,0 +1,172 @@
+# importer.py
+# Bulk expense import. Accepts the same columns api_report exports (CSV or XLSX) or a JSON
+# array, validates every row before touching the database, then inserts all expenses and
+# splits with two executemany statements in a single transaction.
+import csv
+import io
+import math
+from datetime import date, datetime, time
+from sqlalchemy import insert
+from extensions import db, with_write_retry
+from models import User, Expense, Split
+import aggregates
+import analytics
+import changelog
+import versions
+
+MAX_ROWS = 20000
+SHARE_TOLERANCE = 0.01
+
+# report column -> API field; JSON rows may use either spelling
+FIELDS = {"Item": "item", "Amount": "amount", "Payer": "payer", "Category": "category",
+          "Date": "date", "Time": "time", "Participants (share)": "participants"}
+
+
+class InvalidImport(ValueError):
+    """A whole-file problem (unreadable upload, too many rows)."""
+
+
+# ---------- parsing ----------
+def _normalize(raw):
+    return {FIELDS.get(k, k): v for k, v in raw.items() if k is not None}
+
+def parse_json(payload):
+    rows = payload.get("expenses") if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        raise InvalidImport("expected a JSON array of expenses")
+    return [_normalize(r) if isinstance(r, dict) else r for r in rows]
+
+def parse_csv(stream):
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    rows = [_normalize(r) for r in csv.DictReader(text)]
+    text.detach()  # otherwise collecting the wrapper closes the caller's upload stream
+    return rows
+
+def parse_xlsx(stream):
+    from openpyxl import load_workbook
+    try:
+        wb = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as exc:
+        raise InvalidImport(f"could not read workbook: {exc}") from exc
+    ws = wb["Expenses"] if "Expenses" in wb.sheetnames else wb.worksheets[0]
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None) or []
+    out = [_normalize(dict(zip(header, r))) for r in rows if any(v not in (None, "") for v in r)]
+    wb.close()
+    return out
+
+def parse_upload(file_storage):
+    name = (file_storage.filename or "").lower()
+    if name.endswith(".xlsx"):
+        return parse_xlsx(file_storage.stream)
+    if name.endswith(".csv"):
+        return parse_csv(file_storage.stream)
+    raise InvalidImport("upload must be a .csv or .xlsx file")
+
+
+# ---------- validation ----------
+def _parse_date(v):
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    return date.fromisoformat(str(v).strip()[:10]) if v not in (None, "") else date.today()
+
+def _parse_time(v):
+    if isinstance(v, datetime):
+        return v.time().replace(microsecond=0)
+    if isinstance(v, time):
+        return v
+    if v in (None, ""):
+        return datetime.now().time()
+    s = str(v).strip()
+    return datetime.strptime(s, "%H:%M:%S" if s.count(":") == 2 else "%H:%M").time()
+
+class _Members:
+    def __init__(self, household_id):
+        self.by_key = {}
+        for u in User.query.filter_by(household_id=household_id, is_active=True).all():
+            self.by_key[u.id] = u.id
+            self.by_key[str(u.id)] = u.id
+            self.by_key[u.email.lower()] = u.id
+            if u.display_name:
+                self.by_key.setdefault(u.display_name.strip().lower(), u.id)
+
+    def resolve(self, ref):
+        key = ref if isinstance(ref, int) else str(ref).strip().lower()
+        if key not in self.by_key:
+            raise ValueError(f"unknown member {ref!r}")
+        return self.by_key[key]
+
+def _parse_participants(text, members):
+    # "Alice (12.5); Bob (7.5)" as written by the report exporter
+    shares = []
+    for part in str(text).split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.endswith(")") or "(" not in part:
+            raise ValueError(f"bad participant entry {part!r}")
+        name, amount = part[:-1].rsplit("(", 1)
+        shares.append((members.resolve(name.strip()), float(amount)))
+    return shares
+
+def _validate_row(raw, members, household_id, default_payer):
+    if not isinstance(raw, dict):
+        raise ValueError("row must be an object")
+    item = (str(raw.get("item") or "")).strip()
+    amount = float(raw.get("amount") or 0)
+    if not item or not math.isfinite(amount) or amount <= 0:
+        raise ValueError("invalid input")
+    payer = raw.get("payer_id") or raw.get("payer")
+    payer_id = members.resolve(payer) if payer not in (None, "") else default_payer
+
+    if raw.get("shares"):
+        shares = [(members.resolve(s["user_id"]), float(s["share_amount"])) for s in raw["shares"]]
+    elif raw.get("participants"):
+        shares = _parse_participants(raw["participants"], members)
+    else:
+        shares = [(payer_id, amount)]
+    if not all(math.isfinite(a) for _, a in shares):
+        raise ValueError("share amounts must be finite numbers")
+    if abs(sum(a for _, a in shares) - amount) > SHARE_TOLERANCE:
+        raise ValueError("shares do not add up to amount")
+
+    category = raw.get("category")
+    return ({"item": item, "amount": amount, "payer_id": payer_id, "household_id": household_id,
+             "category": str(category).strip() if category not in (None, "") else None,
+             "date": _parse_date(raw.get("date")), "time": _parse_time(raw.get("time"))},
+            shares)
+
+def validate(rows, household_id, default_payer):
+    """Returns (clean_rows, errors); errors is a list of {"row": n, "error": msg} with 1-based n."""
+    if len(rows) > MAX_ROWS:
+        raise InvalidImport(f"at most {MAX_ROWS} rows per import")
+    members = _Members(household_id)
+    clean, errors = [], []
+    for n, raw in enumerate(rows, 1):
+        try:
+            clean.append(_validate_row(raw, members, household_id, default_payer))
+        except (ValueError, TypeError, KeyError) as exc:
+            errors.append({"row": n, "error": str(exc)})
+    return clean, errors
+
+
+# ---------- insert ----------
+@with_write_retry
+def insert_rows(clean):
+    """Insert validated rows in one transaction, retried on lock errors. Returns the new expense ids in input order."""
+    if not clean:
+        return []
+    expense_rows = [e for e, _ in clean]
+    result = db.session.execute(insert(Expense).returning(Expense.id, sort_by_parameter_order=True), expense_rows)
+    ids = [r[0] for r in result]
+    db.session.execute(insert(Split), [
+        {"expense_id": eid, "user_id": uid, "share_amount": share}
+        for eid, (_, shares) in zip(ids, clean) for uid, share in shares])
+    aggregates.record_expenses(expense_rows)
+    analytics.record_expenses(expense_rows)
+    changelog.log_expenses(expense_rows[0]["household_id"], ids)
+    versions.bump(expense_rows[0]["household_id"])
+    db.session.commit()
+    return ids
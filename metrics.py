@@ -0,0 +1,168 @@
+# metrics.py
+# Request-level SQL and timing instrumentation. When METRICS_ENABLED is off, init_app() installs
+# nothing, so disabled instrumentation costs no per-request or per-query work. When it is on,
+# engine events count statements and DB time for the current request, and request hooks add a
+# Server-Timing header, log slow requests/queries as JSON and keep per-route histograms. The
+# histograms live in each worker process; snapshot() reports the worker that answered.
+import json
+import logging
+import os
+import threading
+import time
+from flask import request
+from sqlalchemy import event
+from extensions import db
+
+log = logging.getLogger(__name__)
+
+METRICS_DEFAULTS = {
+    "METRICS_ENABLED": False,
+    "METRICS_SERVER_TIMING": True,
+    "METRICS_SLOW_REQUEST_MS": 500.0,
+    "METRICS_SLOW_QUERY_MS": 100.0,
+}
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SQL_LOG_CHARS = 500
+
+_local = threading.local()
+_lock = threading.Lock()
+_routes = {}
+_started_at = time.time()
+_cfg = {}
+
+
+def _flag(value):
+    return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes", "on")
+
+def init_app(app):
+    """Fill METRICS_* settings from the environment and install hooks if enabled. Call after init_sqlite(app)."""
+    for key, default in METRICS_DEFAULTS.items():
+        raw = os.environ.get(key, default)
+        app.config.setdefault(key, _flag(raw) if isinstance(default, bool) else type(default)(raw))
+    _cfg.update({k: app.config[k] for k in METRICS_DEFAULTS})
+    if not _cfg["METRICS_ENABLED"]:
+        return
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_cursor)
+    event.listen(engine, "after_cursor_execute", _after_cursor)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_clear_request)
+
+def enabled():
+    return bool(_cfg.get("METRICS_ENABLED"))
+
+
+# ---------- SQL ----------
+class _RequestStats:
+    __slots__ = ("started", "queries", "db_ms", "slowest_ms", "slowest_sql")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+
+def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, "stats", None) is not None:
+        conn.info.setdefault("metrics_t0", []).append(time.perf_counter())
+
+def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+    stats = getattr(_local, "stats", None)
+    starts = conn.info.get("metrics_t0")
+    if stats is None or not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    stats.queries += 1
+    stats.db_ms += ms
+    if ms > stats.slowest_ms:
+        stats.slowest_ms, stats.slowest_sql = ms, statement
+    if ms >= _cfg["METRICS_SLOW_QUERY_MS"]:
+        log.warning(json.dumps({"event": "slow_query", "ms": round(ms, 2), "route": _route_key(),
+                                "sql": " ".join(statement.split())[:SQL_LOG_CHARS]}))
+
+
+# ---------- requests ----------
+def _route_key():
+    rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+    return f"{request.method} {rule}"
+
+def _start_request():
+    _local.stats = _RequestStats()
+
+def _clear_request(_exc=None):
+    _local.stats = None
+
+def _finish_request(response):
+    stats = getattr(_local, "stats", None)
+    if stats is None:
+        return response
+    total_ms = (time.perf_counter() - stats.started) * 1000
+    route = _route_key()
+    _observe(route, total_ms, stats)
+    if _cfg["METRICS_SERVER_TIMING"]:
+        parts = [f'db;dur={stats.db_ms:.2f};desc="{stats.queries} queries"',
+                 f"app;dur={max(total_ms - stats.db_ms, 0.0):.2f}",
+                 f"total;dur={total_ms:.2f}"]
+        if stats.slowest_sql is not None:
+            parts.append(f'slowest-query;dur={stats.slowest_ms:.2f}')
+        response.headers.add("Server-Timing", ", ".join(parts))
+    if total_ms >= _cfg["METRICS_SLOW_REQUEST_MS"]:
+        log.warning(json.dumps({
+            "event": "slow_request", "route": route, "path": request.path, "status": response.status_code,
+            "ms": round(total_ms, 2), "queries": stats.queries, "db_ms": round(stats.db_ms, 2),
+            "slowest_ms": round(stats.slowest_ms, 2),
+            "slowest_sql": " ".join(stats.slowest_sql.split())[:SQL_LOG_CHARS] if stats.slowest_sql else None}))
+    return response
+
+
+# ---------- histograms ----------
+def _observe(route, total_ms, stats):
+    with _lock:
+        h = _routes.get(route)
+        if h is None:
+            h = _routes[route] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "db_ms": 0.0, "queries": 0,
+                                  "max_queries": 0, "buckets": [0] * (len(BUCKETS_MS) + 1)}
+        h["count"] += 1
+        h["total_ms"] += total_ms
+        h["max_ms"] = max(h["max_ms"], total_ms)
+        h["db_ms"] += stats.db_ms
+        h["queries"] += stats.queries
+        h["max_queries"] = max(h["max_queries"], stats.queries)
+        i = 0
+        while i < len(BUCKETS_MS) and total_ms > BUCKETS_MS[i]:
+            i += 1
+        h["buckets"][i] += 1
+
+def _quantile(buckets, count, q):
+    """Upper bucket bound holding the q-th request; None past the last bound."""
+    target, seen = q * count, 0
+    for bound, n in zip(BUCKETS_MS, buckets):
+        seen += n
+        if seen >= target:
+            return bound
+    return None
+
+def snapshot():
+    """Per-route histograms for this worker process."""
+    with _lock:
+        routes = {}
+        for route, h in sorted(_routes.items()):
+            n = h["count"]
+            routes[route] = {
+                "count": n, "mean_ms": round(h["total_ms"] / n, 2), "max_ms": round(h["max_ms"], 2),
+                "p50_le_ms": _quantile(h["buckets"], n, 0.50), "p95_le_ms": _quantile(h["buckets"], n, 0.95),
+                "p99_le_ms": _quantile(h["buckets"], n, 0.99),
+                "mean_db_ms": round(h["db_ms"] / n, 2), "mean_queries": round(h["queries"] / n, 2),
+                "max_queries": h["max_queries"],
+                "buckets": dict(zip([f"le_{b}" for b in BUCKETS_MS] + ["inf"], h["buckets"])),
+            }
+    return {"enabled": enabled(), "pid": os.getpid(), "since": _started_at,
+            "slow_request_ms": _cfg.get("METRICS_SLOW_REQUEST_MS"), "slow_query_ms": _cfg.get("METRICS_SLOW_QUERY_MS"),
+            "routes": routes}
+
+def reset():
+    with _lock:
+        _routes.clear()
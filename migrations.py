@@ -0,0 +1,145 @@
+# migrations.py
+# Minimal versioned schema migrations for databases that already exist. db.create_all() only
+# creates missing tables, so index and column changes to existing tables are listed here and
+# applied once at startup. Every statement must be idempotent (IF NOT EXISTS etc.) because
+# several gunicorn workers may start at the same time.
+import hashlib
+import os
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import text
+from extensions import db
+import aggregates
+import analytics
+
+MIGRATIONS = [
+    (1, "hot path indexes", [
+        "CREATE INDEX IF NOT EXISTS ix_expense_household_date_time ON expense (household_id, date, time, id)",
+        "CREATE INDEX IF NOT EXISTS ix_expense_payer ON expense (payer_id)",
+        "CREATE INDEX IF NOT EXISTS ix_split_expense ON split (expense_id)",
+        "CREATE INDEX IF NOT EXISTS ix_split_user ON split (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_user_household_active ON user (household_id, is_active)",
+        "ANALYZE",
+    ]),
+    # External-content FTS5 index over expense text. The household goes in as an "h<id>" token so a
+    # search is an index intersection rather than a scan of other households' matches. Prefix indexes
+    # up to 6 characters let a typed prefix be read incrementally instead of merging every matching
+    # term's doclist. Triggers keep it in step with every insert, delete and edit, whichever code
+    # path makes them.
+    (2, "expense full-text search", [
+        "CREATE VIEW IF NOT EXISTS expense_fts_source AS "
+        "SELECT id, item, category, 'h' || household_id AS household FROM expense",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS expense_fts USING fts5(item, category, household, "
+        "content='expense_fts_source', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4 5 6')",
+        "CREATE TRIGGER IF NOT EXISTS expense_fts_insert AFTER INSERT ON expense BEGIN "
+        "INSERT INTO expense_fts (rowid, item, category, household) "
+        "VALUES (new.id, new.item, new.category, 'h' || new.household_id); END",
+        "CREATE TRIGGER IF NOT EXISTS expense_fts_delete AFTER DELETE ON expense BEGIN "
+        "INSERT INTO expense_fts (expense_fts, rowid, item, category, household) "
+        "VALUES ('delete', old.id, old.item, old.category, 'h' || old.household_id); END",
+        "CREATE TRIGGER IF NOT EXISTS expense_fts_update AFTER UPDATE OF item, category, household_id ON expense BEGIN "
+        "INSERT INTO expense_fts (expense_fts, rowid, item, category, household) "
+        "VALUES ('delete', old.id, old.item, old.category, 'h' || old.household_id); "
+        "INSERT INTO expense_fts (rowid, item, category, household) "
+        "VALUES (new.id, new.item, new.category, 'h' || new.household_id); END",
+        "INSERT INTO expense_fts (expense_fts) VALUES ('rebuild')",
+    ]),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def applied_versions(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_migration ("
+                      "version INTEGER PRIMARY KEY, name VARCHAR(200), applied_at DATETIME)"))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migration"))}
+
+def upgrade():
+    """Apply pending migrations in order. Returns the list of versions applied."""
+    done = []
+    with db.engine.begin() as conn:
+        applied = applied_versions(conn)
+    for version, name, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        with db.engine.begin() as conn:
+            for sql in statements:
+                conn.execute(text(sql))
+            conn.execute(text("INSERT OR IGNORE INTO schema_migration (version, name, applied_at) VALUES (:v, :n, :t)"),
+                         {"v": version, "n": name, "t": datetime.utcnow()})
+        done.append(version)
+    return done
+
+
+# ---------- startup check ----------
+# create_all(), upgrade() and the rollup backfills cost several queries per worker start. Once they
+# have run against this database a marker file records the schema they produced, so later workers
+# skip straight to serving. Any model or migration change alters the fingerprint and reruns them.
+def schema_fingerprint():
+    h = hashlib.sha1(f"migrations:{LATEST}".encode())
+    for table in sorted(db.metadata.tables.values(), key=lambda t: t.name):
+        h.update(table.name.encode())
+        h.update(",".join(sorted(c.name for c in table.columns)).encode())
+        h.update(",".join(sorted(i.name or "" for i in table.indexes)).encode())
+    return h.hexdigest()
+
+def _db_path():
+    url = db.engine.url
+    return url.database if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:") else None
+
+def schema_ok(marker, fingerprint):
+    path = _db_path()
+    if path is None or not os.path.exists(path):
+        return False
+    try:
+        with open(marker) as fh:
+            return fh.read().strip() == fingerprint
+    except OSError:
+        return False
+
+def ensure_schema(force=False):
+    """Bring the database up to the current models and migrations unless the marker says it already is.
+
+    Returns the list of migration versions applied.
+    """
+    marker = current_app.config["SCHEMA_MARKER"]
+    fingerprint = schema_fingerprint()
+    if not force and schema_ok(marker, fingerprint):
+        return []
+    db.create_all()
+    applied = upgrade()
+    aggregates.ensure_built()
+    analytics.ensure_built()
+    if _db_path():
+        tmp = f"{marker}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            fh.write(fingerprint)
+        os.replace(tmp, marker)
+    return applied
+
+
+# ---------- query plan checks ----------
+# Hot queries from app.py/queries.py and the index each is expected to use.
+HOT_QUERIES = [
+    ("expense list", "SELECT * FROM expense WHERE household_id = :hid ORDER BY date DESC, time DESC, id DESC LIMIT 100",
+     "ix_expense_household_date_time"),
+    ("expense page", "SELECT * FROM expense WHERE household_id = :hid AND (date < '2024-06-01' OR (date = '2024-06-01' "
+     "AND (time < '10:00' OR (time = '10:00' AND id < 50)))) ORDER BY date DESC, time DESC, id DESC LIMIT 100",
+     "ix_expense_household_date_time"),
+    ("expense range", "SELECT * FROM expense WHERE household_id = :hid AND date >= '2024-01-01' AND date <= '2024-12-31'",
+     "ix_expense_household_date_time"),
+    ("splits by expense", "SELECT * FROM split WHERE expense_id IN (1, 2, 3)", "ix_split_expense"),
+    ("splits by user", "SELECT * FROM split WHERE user_id = :uid", "ix_split_user"),
+    ("expenses by payer", "SELECT * FROM expense WHERE payer_id = :uid", "ix_expense_payer"),
+    ("active members", "SELECT * FROM user WHERE household_id = :hid AND is_active = 1", "ix_user_household_active"),
+]
+
+def explain_hot_queries():
+    """Returns [(name, expected_index, plan_text, ok)] from EXPLAIN QUERY PLAN for each hot query."""
+    out = []
+    with db.engine.connect() as conn:
+        for name, sql, index in HOT_QUERIES:
+            rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql), {"hid": 1, "uid": 1}).fetchall()
+            plan = "; ".join(r[-1] for r in rows)
+            out.append((name, index, plan, index in plan))
+    return out
@@ -23,6 +23,9 @@ class User(UserMixin, db.Model):
     is_active = db.Column(db.Boolean, default=True)  # Soft delete flag
     is_admin = db.Column(db.Boolean, default=False)  # Admin privileges
 
+    # keep in sync with migrations.py so existing databases get the same indexes
+    __table_args__ = (db.Index('ix_user_household_active', 'household_id', 'is_active'),)
+
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     item = db.Column(db.String(200))
@@ -34,8 +37,103 @@ class Expense(db.Model):
     time = db.Column(db.Time)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_expense_household_date_time', 'household_id', 'date', 'time', 'id'),
+        db.Index('ix_expense_payer', 'payer_id'),
+    )
+
 class Split(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     expense_id = db.Column(db.Integer, db.ForeignKey('expense.id'))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    share_amount = db.Column(db.Float)  # explicit amount
\ No newline at end of file
+    share_amount = db.Column(db.Float)  # explicit amount
+
+    __table_args__ = (
+        db.Index('ix_split_expense', 'expense_id'),
+        db.Index('ix_split_user', 'user_id'),
+    )
+
+# Windowed budgets (see routes/budget.py). daily/monthly/yearly repeat every period between
+# start_date and end_date (open-ended when NULL); custom covers exactly start_date..end_date.
+class Budget(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    period = db.Column(db.String(16), nullable=False)  # daily / monthly / yearly / custom
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_budget_household_start', 'household_id', 'start_date'),)
+
+# Maintained spend aggregates (see aggregates.py). Updated in the same transaction as expense writes.
+class HouseholdTotal(db.Model):
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+
+class HouseholdDailyTotal(db.Model):
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+
+# Monotonic per-household data version, bumped by write paths (see versions.py).
+class HouseholdVersion(db.Model):
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Background report generation (see report_jobs.py). Rows persist across worker restarts.
+class ReportJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    period = db.Column(db.String(16))
+    status = db.Column(db.String(16), default="queued")  # queued / running / done / failed
+    path = db.Column(db.String(512), nullable=True)
+    error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+# Spend rollup per household/day/category/payer (see analytics.py). category '' means uncategorised.
+class ExpenseRollup(db.Model):
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(80), primary_key=True, default="")
+    payer_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+
+# Change log for delta sync (see changelog.py). seq is monotonic; op is 'upsert' or 'delete'.
+class ExpenseChange(db.Model):
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), nullable=False)
+    expense_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(8), nullable=False, default="upsert")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_expense_change_household_seq', 'household_id', 'seq'),)
+
+# Closed periods moved out of Expense/Split into columnar snapshots (see archive.py). path is
+# relative to ARCHIVE_DIR; a new snapshot directory is written for every change to the period.
+class ArchivedPeriod(db.Model):
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    period_end = db.Column(db.Date, nullable=False)
+    path = db.Column(db.String(512), nullable=False)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    split_count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Net balance (paid - owed) per member for each archived period, so settlement skips the snapshots.
+class ArchivedBalance(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    household_id = db.Column(db.Integer, db.ForeignKey('household.id'), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    net = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (db.Index('ix_archived_balance_household', 'household_id', 'period_start'),)
@@ -0,0 +1,120 @@
+# queries.py
+# Batched loading of expenses together with their splits and the users they reference.
+# The number of SQL round trips stays fixed regardless of how many expenses are returned.
+import base64
+import json
+from datetime import date, time
+from sqlalchemy import and_, or_
+from extensions import db
+from models import User, Expense, Split
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def load_expenses(q):
+    """Run an Expense query and load its splits and users in two more queries.
+
+    Returns (expenses, splits_by_expense, users_by_id).
+    """
+    expenses = q.all()
+    if not expenses:
+        return [], {}, {}
+
+    # Re-use the same filtered/ordered/limited query as a subquery so the split
+    # lookup is a single statement no matter how many expenses matched.
+    ids = q.with_entities(Expense.id)
+    splits_by_expense = {}
+    for s in Split.query.filter(Split.expense_id.in_(ids.scalar_subquery())).order_by(Split.id).all():
+        splits_by_expense.setdefault(s.expense_id, []).append(s)
+
+    user_ids = {e.payer_id for e in expenses}
+    for shares in splits_by_expense.values():
+        user_ids.update(s.user_id for s in shares)
+    user_ids.discard(None)
+    users_by_id = {u.id: u for u in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    return expenses, splits_by_expense, users_by_id
+
+
+# ---------- keyset pagination on (date, time, id), newest first ----------
+def newest_first(q):
+    return q.order_by(Expense.date.desc(), Expense.time.desc(), Expense.id.desc())
+
+def encode_cursor(e):
+    raw = json.dumps([e.date.isoformat(), e.time.isoformat(), e.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Returns (date, time, id) or raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        d, t, i = json.loads(raw)
+        return date.fromisoformat(d), time.fromisoformat(t), int(i)
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+def after_cursor(q, key):
+    d, t, i = key
+    return q.filter(or_(Expense.date < d,
+                        and_(Expense.date == d, or_(Expense.time < t,
+                                                    and_(Expense.time == t, Expense.id < i)))))
+
+def load_page(q, limit, key=None):
+    """One newest-first page of q. Returns (expenses, splits_by_expense, users_by_id, next_cursor)."""
+    if key:
+        q = after_cursor(q, key)
+    expenses, splits, users = load_expenses(newest_first(q).limit(limit + 1))
+    next_cursor = None
+    if len(expenses) > limit:
+        expenses = expenses[:limit]
+        next_cursor = encode_cursor(expenses[-1])
+    return expenses, splits, users, next_cursor
+
+def iter_expense_dicts(q, batch=MAX_PAGE_SIZE):
+    """Yield every expense in q as a dict, newest first, one keyset page at a time.
+
+    Loaded rows are expunged after each page so memory stays flat for long histories.
+    """
+    key = None
+    while True:
+        page_q = after_cursor(q, key) if key else q
+        expenses, splits, users = load_expenses(newest_first(page_q).limit(batch))
+        for e in expenses:
+            yield expense_to_dict(e, splits.get(e.id, []), users)
+        if len(expenses) < batch:
+            return
+        last = expenses[-1]
+        key = (last.date, last.time, last.id)
+        for e in expenses:
+            db.session.expunge(e)
+        for shares in splits.values():
+            for s in shares:
+                db.session.expunge(s)
+
+
+# ---------- serializers ----------
+def _list_name(user, fallback):
+    if user and user.is_active:
+        return user.display_name if user.display_name else user.email
+    return fallback
+
+def _report_name(user, fallback):
+    return user.display_name if user and user.is_active else fallback
+
+def expense_to_dict(e, splits, users):
+    shares_out = []
+    for s in splits:
+        shares_out.append({"user_id": s.user_id, "share_amount": s.share_amount,
+                           "display_name": _list_name(users.get(s.user_id), "Unknown User")})
+    return {
+        "id": e.id, "item": e.item, "amount": e.amount,
+        "payer_id": e.payer_id, "payer_name": _list_name(users.get(e.payer_id), "Unknown Payer"),
+        "category": e.category, "date": e.date.isoformat(), "time": e.time.strftime("%H:%M"),
+        "shares": shares_out
+    }
+
+def expense_to_report_row(e, splits, users):
+    participants = "; ".join(f"{_report_name(users.get(s.user_id), 'Unknown User')} ({s.share_amount})" for s in splits)
+    return {"Item": e.item, "Amount": e.amount, "Payer": _report_name(users.get(e.payer_id), "Unknown Payer"),
+            "Category": e.category or "", "Date": e.date.isoformat(), "Time": e.time.strftime("%H:%M"),
+            "Participants (share)": participants}
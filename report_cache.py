@@ -0,0 +1,130 @@
+# report_cache.py
+# On-disk cache for generated report files, shared by all gunicorn workers.
+#
+# Entries are keyed by household, period, date window, format and household data version, so
+# any write (which bumps the version) makes older entries unreachable; they are removed when a
+# newer entry for the same household/period is stored, or by the size/age-bounded LRU sweep,
+# which also clears out the timestamped files earlier builds left in the reports directory.
+# Files are written to a temp name and renamed into place, and hits are served from an
+# already-open handle, so concurrent eviction by another worker is harmless.
+import fcntl
+import hashlib
+import os
+import time
+from flask import current_app
+
+
+def _cache_dir():
+    path = current_app.config["REPORT_CACHE_DIR"]
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def entry_path(household_id, period, start, end, version, fmt="xlsx"):
+    key = hashlib.sha256(f"{household_id}|{period}|{start}|{end}|{version}|{fmt}".encode()).hexdigest()[:24]
+    return os.path.join(_cache_dir(), f"hh{household_id}_{period}_{key}.{fmt}")
+
+def _open_hit(path):
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)  # mtime doubles as last-access time for LRU
+    except FileNotFoundError:
+        pass
+    return fh
+
+def lookup(household_id, period, start, end, version, fmt="xlsx"):
+    """Path of an existing entry, or None."""
+    path = entry_path(household_id, period, start, end, version, fmt)
+    return path if os.path.exists(path) else None
+
+def get_or_build(household_id, period, start, end, version, build, fmt="xlsx"):
+    """Return an open binary file for the report, calling build(path) to create it on a miss."""
+    path = entry_path(household_id, period, start, end, version, fmt)
+    fh = _open_hit(path)
+    if fh is not None:
+        return fh
+    build(path)
+    fh = open(path, "rb")
+    _drop_stale(household_id, period, keep=path)
+    evict()
+    return fh
+
+
+# ---------- eviction ----------
+def _drop_stale(household_id, period, keep):
+    prefix = f"hh{household_id}_{period}_"
+    cache_dir = os.path.dirname(keep)
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and path != keep and not name.endswith(".tmp"):
+            _remove(path)
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _sweep_legacy(reports_dir, now, max_age):
+    """Remove timestamped report_*.xlsx files that builds before the cache wrote next to it."""
+    removed = 0
+    for entry in os.scandir(reports_dir):
+        if not (entry.name.startswith("report_") and entry.name.endswith(".xlsx") and entry.is_file()):
+            continue
+        try:
+            if now - entry.stat().st_mtime > max_age:
+                _remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+def evict(max_bytes=None, max_age=None):
+    """Delete entries older than max_age seconds, then least recently used ones until under max_bytes.
+
+    Old-style report_*.xlsx files in the reports directory are swept by age too.
+
+    Only one worker sweeps at a time; others skip rather than wait.
+    """
+    cfg = current_app.config
+    max_bytes = cfg["REPORT_CACHE_MAX_BYTES"] if max_bytes is None else max_bytes
+    max_age = cfg["REPORT_CACHE_MAX_AGE"] if max_age is None else max_age
+    cache_dir = _cache_dir()
+    with open(os.path.join(cache_dir, ".lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        now = time.time()
+        entries = []
+        for entry in os.scandir(cache_dir):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            # leftover temp files from crashed writers are only removed once clearly abandoned
+            if entry.name.endswith(".tmp") and now - st.st_mtime < 3600:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+
+        removed = _sweep_legacy(os.path.dirname(cache_dir), now, max_age)
+        total = 0
+        keep = []
+        for mtime, size, path in entries:
+            if now - mtime > max_age or path.endswith(".tmp"):
+                _remove(path)
+                removed += 1
+            else:
+                keep.append((mtime, size, path))
+                total += size
+        for mtime, size, path in sorted(keep):
+            if total <= max_bytes:
+                break
+            _remove(path)
+            total -= size
+            removed += 1
+        return removed
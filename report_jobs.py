@@ -0,0 +1,160 @@
+# report_jobs.py
+# Asynchronous report generation. submit() records a ReportJob row and hands it to a local
+# process pool; any worker can answer status polls from the database. A pool broken by a dead
+# child is replaced on the next dispatch and the job it held is marked failed; jobs whose web
+# worker died are re-dispatched on the next poll.
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from flask import has_app_context
+from extensions import db
+from models import ReportJob
+import identity_cache
+import reports
+import report_cache
+import versions
+
+log = logging.getLogger(__name__)
+
+_app = None
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def init_app(app):
+    global _app
+    _app = app
+    app.config.setdefault("REPORT_JOB_WORKERS", int(os.environ.get("REPORT_JOB_WORKERS", 1)))
+    app.config.setdefault("REPORT_JOB_TIMEOUT", int(os.environ.get("REPORT_JOB_TIMEOUT", 15 * 60)))
+
+
+def build_cached(household_id, period):
+    """Open file handle for the household's report, generating it on a cache miss."""
+    start, end = reports.period_window(period)
+    hh = identity_cache.get_household(household_id)
+    budget = hh.budget if hh else 0.0
+    return report_cache.get_or_build(household_id, period, start, end, versions.current(household_id),
+                                     lambda path: reports.write_xlsx(path, household_id, budget, start, end))
+
+
+# ---------- pool ----------
+def _init_worker():
+    # connections inherited from the forked parent must not be reused by the child
+    with _app.app_context():
+        db.engine.dispose(close=False)
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=_app.config["REPORT_JOB_WORKERS"],
+                                        mp_context=multiprocessing.get_context("fork"),
+                                        initializer=_init_worker)
+            _pool_pid = os.getpid()
+        return _pool
+
+def _drop_pool(pool):
+    """Forget a broken pool so the next dispatch starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _fail(job_id, error):
+    if not has_app_context():  # pool callbacks run on the executor's own thread
+        with _app.app_context():
+            return _fail(job_id, error)
+    ReportJob.query.filter(ReportJob.id == job_id, ReportJob.status.in_(("queued", "running"))).update(
+        {"status": "failed", "error": error, "finished_at": datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+
+def _log_crash(job_id, pool, future):
+    exc = future.exception()
+    if exc is None:
+        return
+    log.error("report job %s pool task crashed: %s", job_id, exc)
+    if isinstance(exc, BrokenProcessPool):
+        # a pool process died (e.g. OOM-killed); the job it held will never finish
+        _drop_pool(pool)
+        _fail(job_id, "report worker crashed")
+
+def _dispatch(job_id):
+    for attempt in range(2):
+        pool = _get_pool()
+        try:
+            future = pool.submit(run_job, job_id)
+        except BrokenProcessPool:
+            _drop_pool(pool)
+            continue
+        future.add_done_callback(functools.partial(_log_crash, job_id, pool))
+        return
+    _fail(job_id, "report worker pool unavailable")
+
+
+# ---------- lifecycle ----------
+def submit(household_id, user_id, period):
+    """Create a job for period and start it in the background. Returns the ReportJob."""
+    start, end = reports.period_window(period)
+    cached = report_cache.lookup(household_id, period, start, end, versions.current(household_id))
+    now = datetime.utcnow()
+    job = ReportJob(household_id=household_id, user_id=user_id, period=period)
+    if cached:
+        job.status, job.path, job.started_at, job.finished_at = "done", cached, now, now
+    db.session.add(job)
+    db.session.commit()
+    if job.status == "queued":
+        _dispatch(job.id)
+    return job
+
+def run_job(job_id):
+    """Executed in a pool process. Claims the job atomically so a re-dispatched job never runs twice."""
+    with _app.app_context():
+        claimed = ReportJob.query.filter_by(id=job_id, status="queued").update(
+            {"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return
+        job = db.session.get(ReportJob, job_id)
+        try:
+            fh = build_cached(job.household_id, job.period)
+            job.path = fh.name
+            fh.close()
+            job.status = "done"
+        except Exception as exc:
+            db.session.rollback()
+            job = db.session.get(ReportJob, job_id)
+            job.status = "failed"
+            job.error = str(exc)[:500]
+            log.exception("report job %s failed", job_id)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+def requeue(job):
+    job.status, job.path, job.started_at, job.finished_at = "queued", None, None, None
+    job.created_at = datetime.utcnow()
+    db.session.commit()
+    _dispatch(job.id)
+
+def recover(job):
+    """Re-dispatch a job whose worker process went away (queued or running past the timeout)."""
+    timeout = timedelta(seconds=_app.config["REPORT_JOB_TIMEOUT"])
+    now = datetime.utcnow()
+    if job.status == "queued" and now - job.created_at > timeout:
+        requeue(job)
+    elif job.status == "running" and job.started_at and now - job.started_at > timeout:
+        requeue(job)
+
+def to_dict(job):
+    out = {"job_id": job.id, "period": job.period, "status": job.status,
+           "created_at": job.created_at.isoformat() if job.created_at else None,
+           "finished_at": job.finished_at.isoformat() if job.finished_at else None}
+    if job.status == "failed":
+        out["error"] = job.error
+    return out
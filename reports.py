@@ -0,0 +1,130 @@
+# reports.py
+# Report export engine: rows are read from a single streaming database cursor (plus any archived
+# snapshots in the window) and written straight into a write-only openpyxl workbook or a
+# streamed CSV, so memory stays bounded no matter how long the household history is.
+import csv
+import heapq
+import io
+import os
+from datetime import date, time
+from sqlalchemy import or_, select
+from extensions import db
+from models import User, Expense, Split
+from queries import expense_to_report_row
+import archive
+
+COLUMNS = ["Item", "Amount", "Payer", "Category", "Date", "Time", "Participants (share)"]
+PERIODS = ("daily", "monthly", "yearly", "full")
+BATCH_SIZE = 1000
+
+
+def period_window(period, today=None):
+    """(start, end) dates for a report period; None means unbounded. full -> (None, None)."""
+    today = today or date.today()
+    if period == "daily":
+        return today, today
+    if period == "monthly":
+        return today.replace(day=1), None
+    if period == "yearly":
+        return date(today.year, 1, 1), None
+    return None, None
+
+def _filters(household_id, start=None, end=None):
+    conds = [Expense.household_id == household_id]
+    if start:
+        conds.append(Expense.date >= start)
+    if end:
+        conds.append(Expense.date <= end)
+    return conds
+
+def iter_report_rows(household_id, start=None, end=None):
+    """Yield report rows (tuples in COLUMNS order), oldest first.
+
+    Expenses are LEFT JOINed to their splits and read from a single cursor in yield_per
+    batches; consecutive rows of the same expense are folded into one report row. Archived
+    periods in the window are merged in by (date, time, id).
+    """
+    conds = _filters(household_id, start, end)
+    ids = select(Expense.id).where(*conds)
+    cold = archive.periods(household_id, start, end)
+    wanted = [User.id.in_(select(Expense.payer_id).where(*conds)),
+              User.id.in_(select(Split.user_id).where(Split.expense_id.in_(ids)))]
+    if cold:
+        wanted.append(User.id.in_(archive.user_ids(household_id, start, end, cold)))
+    users = {u.id: u for u in User.query.filter(or_(*wanted)).all()}
+
+    stmt = (select(Expense.id, Expense.item, Expense.amount, Expense.payer_id, Expense.category,
+                   Expense.date, Expense.time, Split.user_id, Split.share_amount)
+            .outerjoin(Split, Split.expense_id == Expense.id)
+            .where(*conds)
+            .order_by(Expense.date.asc(), Expense.time.asc(), Expense.id.asc(), Split.id.asc())
+            .execution_options(yield_per=BATCH_SIZE))
+    rows = _fold(db.session.execute(stmt))
+    if cold:
+        rows = heapq.merge(rows, archive.iter_expenses(household_id, start, end, cold), key=_order)
+    for e, shares in rows:
+        yield _row(e, shares, users)
+
+def _fold(result):
+    """(expense, shares) pairs from joined expense/split rows ordered by expense."""
+    current, shares = None, []
+    for r in result:
+        if current is not None and r.id != current.id:
+            yield current, shares
+            shares = []
+        current = r
+        if r.user_id is not None or r.share_amount is not None:
+            shares.append(r)
+    if current is not None:
+        yield current, shares
+
+def _order(pair):
+    e = pair[0]
+    return e.date, e.time or time.min, e.id
+
+def _row(e, shares, users):
+    row = expense_to_report_row(e, shares, users)
+    return tuple(row[c] for c in COLUMNS)
+
+
+# ---------- writers ----------
+def write_xlsx(path, household_id, budget, start=None, end=None):
+    """Write the Expenses and Summary sheets to path. Returns total spent.
+
+    The file is written next to path and renamed into place, so readers never see a partial workbook.
+    """
+    from openpyxl import Workbook  # heavy; only report workers need it
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Expenses")
+    ws.append(COLUMNS)
+    total_spent = 0.0
+    for row in iter_report_rows(household_id, start, end):
+        ws.append(row)
+        total_spent += float(row[1])
+    summary = wb.create_sheet("Summary")
+    summary.append(["Metric", "Value"])
+    summary.append(["Budget", budget])
+    summary.append(["Total Spent", total_spent])
+    summary.append(["Remaining", budget - total_spent])
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        wb.save(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return total_spent
+
+def iter_csv(household_id, start=None, end=None):
+    """Yield the Expenses sheet as CSV text chunks, header first."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for i, row in enumerate(iter_report_rows(household_id, start, end), 1):
+        writer.writerow(row)
+        if i % BATCH_SIZE == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
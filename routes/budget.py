@@ -1,62 +1,116 @@
+import calendar
+import datetime
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import Budget, Expense
-from extensions import db   # if you created extensions.py
-
-from models import Budget, Expense
-import datetime
+from sqlalchemy import or_
+from extensions import db, with_write_retry
+from models import Budget
+import aggregates
+import versions
 
 budget_bp = Blueprint('budget', __name__)
 
-# Set a budget
-@budget_bp.route('/budget', methods=['POST'])
+PERIODS = ("daily", "monthly", "yearly", "custom")
+
+
+def window(budget, on):
+    """(start, end) of the budget's window containing `on`, or None if the budget is not active then."""
+    if on < budget.start_date or (budget.end_date and on > budget.end_date):
+        return None
+    if budget.period == "custom":
+        return budget.start_date, budget.end_date
+    if budget.period == "daily":
+        start, end = on, on
+    elif budget.period == "monthly":
+        start = on.replace(day=1)
+        end = on.replace(day=calendar.monthrange(on.year, on.month)[1])
+    else:
+        start, end = datetime.date(on.year, 1, 1), datetime.date(on.year, 12, 31)
+    # a budget that starts or ends mid-period only covers its own days
+    return max(start, budget.start_date), (min(end, budget.end_date) if budget.end_date else end)
+
+def _parse_date(value, field):
+    try:
+        return datetime.date.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be YYYY-MM-DD")
+
+def to_dict(budget, win=None, spent=None):
+    out = {"id": budget.id, "amount": budget.amount, "period": budget.period,
+           "start_date": budget.start_date.isoformat(),
+           "end_date": budget.end_date.isoformat() if budget.end_date else None}
+    if win:
+        out.update({"window_start": win[0].isoformat(), "window_end": win[1].isoformat(),
+                    "budget": budget.amount, "spent": spent, "remaining": budget.amount - spent})
+    return out
+
+
+# Set a budget (admin only)
+@budget_bp.route('/budgets', methods=['POST'])
 @login_required
+@with_write_retry
 def set_budget():
-    data = request.json
-    amount = data.get("amount")
-    period = data.get("period")   # daily / monthly / yearly
-    start_date = datetime.date.fromisoformat(data.get("start_date"))
-    end_date = datetime.date.fromisoformat(data.get("end_date"))
-
-    budget = Budget(
-        amount=amount,
-        period=period,
-        start_date=start_date,
-        end_date=end_date,
-        household_id=current_user.household_id
-    )
+    if not current_user.is_admin:
+        return jsonify({"error": "admin access required"}), 403
+    data = request.get_json(force=True) or {}
+    period = data.get("period")
+    try:
+        amount = float(data.get("amount") or 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "amount must be a number"}), 400
+    try:
+        start_date = _parse_date(data.get("start_date"), "start_date") or datetime.date.today()
+        end_date = _parse_date(data.get("end_date"), "end_date")
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if amount <= 0:
+        return jsonify({"error": "amount must be positive"}), 400
+    if period not in PERIODS:
+        return jsonify({"error": f"period must be one of {', '.join(PERIODS)}"}), 400
+    if period == "custom" and not end_date:
+        return jsonify({"error": "custom budgets need an end_date"}), 400
+    if end_date and end_date < start_date:
+        return jsonify({"error": "end_date is before start_date"}), 400
+
+    budget = Budget(amount=amount, period=period, start_date=start_date, end_date=end_date,
+                    household_id=current_user.household_id)
     db.session.add(budget)
+    versions.bump(current_user.household_id)
     db.session.commit()
+    return jsonify(to_dict(budget)), 201
 
-    return jsonify({"message": "Budget set successfully!"}), 201
 
-
-# Get current budget + spent + remaining
-@budget_bp.route('/budget', methods=['GET'])
+# Active budgets with spent + remaining for the window containing ?on= (default today)
+@budget_bp.route('/budgets', methods=['GET'])
 @login_required
-def get_budget():
-    today = datetime.date.today()
-    budget = Budget.query.filter(
+def get_budgets():
+    try:
+        on = _parse_date(request.args.get("on"), "on") or datetime.date.today()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    budgets = Budget.query.filter(
         Budget.household_id == current_user.household_id,
-        Budget.start_date <= today,
-        Budget.end_date >= today
-    ).order_by(Budget.start_date.desc()).first()
-
-    if not budget:
-        return jsonify({"budget": 0, "spent": 0, "remaining": 0})
-
-    # Calculate spent
-    expenses = Expense.query.filter(
-        Expense.household_id == current_user.household_id,
-        Expense.date >= budget.start_date,
-        Expense.date <= budget.end_date
-    ).all()
-
-    spent = sum([e.amount for e in expenses])
-    remaining = budget.amount - spent
-
-    return jsonify({
-        "budget": budget.amount,
-        "spent": spent,
-        "remaining": remaining
-    })
+        Budget.start_date <= on,
+        or_(Budget.end_date.is_(None), Budget.end_date >= on)
+    ).order_by(Budget.start_date.desc(), Budget.id.desc()).all()
+
+    active = [(b, window(b, on)) for b in budgets]
+    spent = aggregates.window_totals(current_user.household_id, [w for _, w in active])
+    return jsonify({"on": on.isoformat(),
+                    "budgets": [to_dict(b, w, s) for (b, w), s in zip(active, spent)]})
+
+
+# Remove a budget (admin only)
+@budget_bp.route('/budgets/<int:budget_id>', methods=['DELETE'])
+@login_required
+@with_write_retry
+def delete_budget(budget_id):
+    if not current_user.is_admin:
+        return jsonify({"error": "admin access required"}), 403
+    budget = db.session.get(Budget, budget_id)
+    if not budget or budget.household_id != current_user.household_id:
+        return jsonify({"error": "budget not found"}), 404
+    db.session.delete(budget)
+    versions.bump(current_user.household_id)
+    db.session.commit()
+    return jsonify({"message": "budget deleted"})
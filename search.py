@@ -0,0 +1,153 @@
+# search.py
+# Full-text search over expense item and category, backed by the expense_fts FTS5 table that
+# migration 2 creates. Triggers on expense keep the index current, so nothing here writes to it
+# except rebuild(). Every word of the query is a prefix match and the household token confines the
+# match to one household inside the index. Results are ranked bm25-style, item weighted over
+# category. Ranking is complete when at most SEARCH_RANK_WINDOW rows match; beyond that only the
+# newest SEARCH_RANK_WINDOW matches are ranked and older ones follow newest first, which the
+# API reports as ranking.complete = false. Archived years are not indexed; restore a year to
+# make it searchable again.
+import base64
+import json
+import re
+import unicodedata
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from extensions import db
+from models import Expense
+from queries import load_expenses
+
+PAGE_SIZE = 50
+MAX_TERMS = 8
+RANK_WINDOW = 500  # default for SEARCH_RANK_WINDOW; each ranked row costs ~10us
+ITEM_WEIGHT, CATEGORY_WEIGHT = 4.0, 1.0
+BM25_K1, BM25_B = 1.2, 0.75
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _fold(text):
+    """Lower-case and strip accents the way the unicode61 tokenizer does, so scoring sees its tokens."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c)) if not text.isascii() else text
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+def match_expression(household_id, q):
+    """FTS5 MATCH string for the words in q, or None if q has none.
+
+    Words are quoted so user input can never reach FTS5 query syntax.
+    """
+    words = _WORD.findall(q or "")[:MAX_TERMS]
+    if not words:
+        return None
+    terms = " AND ".join(f'"{w}"*' for w in words)
+    return f'household : "h{int(household_id)}" AND {{item category}} : ({terms})'
+
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        (offset,) = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError
+        return offset
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise InvalidSearch("invalid cursor") from exc
+
+
+def _rank(terms, window):
+    """Ids of window rows (id, item, category, date) best first, newest first on ties.
+
+    The score is bm25 without its IDF factor: every row holds every term, so IDF cannot reorder them.
+    """
+    docs = [(expense_id, day, _WORD.findall(_fold(item or "")), _WORD.findall(_fold(category or "")))
+            for expense_id, item, category, day in window]
+    avg_item = max(sum(len(d[2]) for d in docs) / len(docs), 1.0)
+    avg_category = max(sum(len(d[3]) for d in docs) / len(docs), 1.0)
+    k1 = BM25_K1 + 1
+    scored = []
+    for expense_id, day, item_words, category_words in docs:
+        score = 0.0
+        for words, weight, avg in ((item_words, ITEM_WEIGHT, avg_item), (category_words, CATEGORY_WEIGHT, avg_category)):
+            if words:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * len(words) / avg)
+                for term in terms:
+                    tf = sum(w.startswith(term) for w in words)
+                    if tf:
+                        score += weight * tf * k1 / (tf + norm)
+        scored.append((score, day, expense_id))
+    scored.sort(reverse=True)
+    return [expense_id for _, _, expense_id in scored]
+
+def search(household_id, q, start=None, end=None, min_amount=None, max_amount=None, payer_id=None,
+           limit=PAGE_SIZE, offset=0):
+    """One page of matching expenses, best match first.
+
+    If more than SEARCH_RANK_WINDOW rows match, only the newest that many (by expense id) are
+    ranked and anything older follows newest first.
+    Returns (expenses, splits_by_expense, users_by_id, next_cursor, ranking_complete).
+    """
+    match = match_expression(household_id, q)
+    if match is None:
+        raise InvalidSearch("q must contain at least one word")
+    where, params = ["expense_fts MATCH :match", "e.household_id = :hid"], {"match": match, "hid": household_id}
+    for clause, key, value in (("e.date >= :start", "start", start), ("e.date <= :end", "end", end),
+                               ("e.amount >= :min_amount", "min_amount", min_amount),
+                               ("e.amount <= :max_amount", "max_amount", max_amount),
+                               ("e.payer_id = :payer_id", "payer_id", payer_id)):
+        if value is not None:
+            where.append(clause)
+            params[key] = value.isoformat() if key in ("start", "end") else value
+    # FTS5 walks the household's matches newest first and stops at the LIMIT, so the cost is set
+    # by the window, not by how many rows match. The built-in bm25 would first scan the whole
+    # household token's doclist for its IDF, which alone costs tens of ms on a large household.
+    sql = ("SELECT e.id, e.item, e.category, e.date FROM expense_fts JOIN expense e ON e.id = expense_fts.rowid "
+           f"WHERE {' AND '.join(where)} {{older}} ORDER BY expense_fts.rowid DESC LIMIT :n")
+    size = current_app.config.get("SEARCH_RANK_WINDOW", RANK_WINDOW)
+    window = db.session.execute(text(sql.format(older="")), dict(params, n=size + 1)).all()
+    complete = len(window) <= size
+    window = window[:size]
+    ids = []
+    if offset < len(window):
+        terms = _WORD.findall(_fold(q))[:MAX_TERMS]
+        ids = _rank(terms, window)[offset:offset + limit + 1]
+    if not complete and len(ids) <= limit:
+        # past the ranked window: continue with older matches, newest first
+        skip = max(offset - size, 0)
+        older = db.session.execute(text(sql.format(older="AND e.id < :oldest") + " OFFSET :skip"),
+                                   dict(params, oldest=window[-1][0], n=limit + 1 - len(ids), skip=skip)).all()
+        ids += [r[0] for r in older]
+
+    next_cursor = None
+    if len(ids) > limit:
+        ids = ids[:limit]
+        next_cursor = encode_cursor(offset + limit)
+    if not ids:
+        return [], {}, {}, None, complete
+    expenses, splits, users = load_expenses(Expense.query.filter(Expense.id.in_(ids)))
+    order = {expense_id: i for i, expense_id in enumerate(ids)}
+    expenses.sort(key=lambda e: order[e.id])
+    return expenses, splits, users, next_cursor, complete
+
+
+# ---------- maintenance ----------
+def rebuild():
+    """Re-index every expense from scratch and merge the index into one segment. Returns rows indexed."""
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO expense_fts (expense_fts) VALUES ('rebuild')"))
+        conn.execute(text("INSERT INTO expense_fts (expense_fts) VALUES ('optimize')"))
+        return conn.execute(text("SELECT COUNT(*) FROM expense")).scalar()
+
+def verify():
+    """Compare the index with the expense table using FTS5's integrity-check. Returns a list of problems."""
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(text("INSERT INTO expense_fts (expense_fts, rank) VALUES ('integrity-check', 1)"))
+    except DBAPIError as exc:
+        return [f"expense_fts: {exc.orig}"]
+    return []
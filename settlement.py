@@ -0,0 +1,77 @@
+# settlement.py
+# Who owes whom inside a household. Net balances (paid as Expense.payer_id minus owed via
+# Split.share_amount, plus the stored balances of archived periods) come from one grouped SQL aggregate; a greedy min-cash-flow pass turns
+# them into a short list of transfers. Results are cached per household data version.
+import heapq
+from collections import OrderedDict
+from sqlalchemy import func, select, union_all
+from extensions import db
+from models import User, Expense, Split, ArchivedBalance
+import versions
+
+CACHE_SIZE = 256
+_cache = OrderedDict()  # household_id -> (version, result)
+
+
+def net_balances(household_id):
+    """{user_id: balance_in_cents}; positive means the household owes that member."""
+    paid = select(Expense.payer_id.label("user_id"), Expense.amount.label("delta")).where(
+        Expense.household_id == household_id)
+    owed = select(Split.user_id.label("user_id"), (-Split.share_amount).label("delta")).join(
+        Expense, Expense.id == Split.expense_id).where(Expense.household_id == household_id)
+    archived = select(ArchivedBalance.user_id.label("user_id"), ArchivedBalance.net.label("delta")).where(
+        ArchivedBalance.household_id == household_id)
+    movements = union_all(paid, owed, archived).subquery()
+    stmt = select(movements.c.user_id, func.sum(movements.c.delta)).where(
+        movements.c.user_id.isnot(None)).group_by(movements.c.user_id)
+    return {uid: int(round((total or 0) * 100)) for uid, total in db.session.execute(stmt)}
+
+def settle(balances):
+    """Greedy min-cash-flow: repeatedly settle the largest debtor against the largest creditor.
+
+    balances maps member -> cents. Returns [(from, to, cents)], at most len(members) - 1 transfers.
+    """
+    creditors = [(-cents, uid) for uid, cents in balances.items() if cents > 0]
+    debtors = [(cents, uid) for uid, cents in balances.items() if cents < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+    transfers = []
+    while creditors and debtors:
+        credit, to_uid = heapq.heappop(creditors)
+        debt, from_uid = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((from_uid, to_uid, amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, to_uid))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, from_uid))
+    return transfers
+
+def household_settlement(household_id):
+    """Balances and settling transfers for the household, cached until its data version changes."""
+    version = versions.current(household_id)
+    hit = _cache.get(household_id)
+    if hit and hit[0] == version:
+        _cache.move_to_end(household_id)
+        return hit[1]
+
+    balances = net_balances(household_id)
+    transfers = settle(balances)
+    users = {u.id: u for u in User.query.filter(User.id.in_(balances)).all()} if balances else {}
+
+    def name(uid):
+        u = users.get(uid)
+        return (u.display_name or u.email) if u else "Unknown User"
+
+    result = {
+        "balances": [{"user_id": uid, "display_name": name(uid), "balance": cents / 100}
+                     for uid, cents in sorted(balances.items(), key=lambda kv: -kv[1])],
+        "transfers": [{"from_user_id": f, "from_name": name(f), "to_user_id": t, "to_name": name(t),
+                       "amount": cents / 100} for f, t, cents in transfers],
+        "version": version,
+    }
+    _cache[household_id] = (version, result)
+    _cache.move_to_end(household_id)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return result
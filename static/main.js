@@ -1,14 +1,28 @@
 // =============================
 // Helper API function
 // =============================
+// GET responses are kept with their ETag and reused on 304 Not Modified; one entry per
+// endpoint, so changing query strings cannot grow the cache.
+const apiCache = new Map();
+
 async function api(path, opts={}) {
-  const res = await fetch(path, opts);
+  const method = (opts.method || 'GET').toUpperCase();
+  const endpoint = path.split('?')[0];
+  const entry = method === 'GET' ? apiCache.get(endpoint) : null;
+  const cached = entry && entry.path === path ? entry : null;
+  const headers = { ...(opts.headers || {}) };
+  if (cached) headers['If-None-Match'] = cached.etag;
+  const res = await fetch(path, { ...opts, headers });
+  if (res.status === 304 && cached) return cached.body;
   if (!res.ok) {
     const t = await res.text();
     console.error("API error", res.status, t);
     return null;
   }
-  return res.json();
+  const body = await res.json();
+  const etag = res.headers.get('ETag');
+  if (method === 'GET' && etag) apiCache.set(endpoint, { path, etag, body });
+  return body;
 }
 
 // =============================
@@ -134,6 +148,20 @@ async function loadExpenses(){
 // =============================
 // Download Report
 // =============================
-function download(period){
-  window.location.href = `/api/report/${period}`;
+// Reports are built in the background: submit a job, poll it, then download the file.
+// Polling backs off to every 5s and gives up after REPORT_POLL_LIMIT_MS; the job keeps
+// running on the server and a later click picks up the cached file.
+const REPORT_POLL_LIMIT_MS = 3 * 60 * 1000;
+async function download(period){
+  let job = await api(`/api/report/${period}/jobs`, { method:'POST' });
+  let delay = 1000;
+  const deadline = Date.now() + REPORT_POLL_LIMIT_MS;
+  while(job && (job.status === 'queued' || job.status === 'running')){
+    if(Date.now() > deadline){ alert('The report is still being generated. Try again in a few minutes.'); return; }
+    await new Promise(resolve => setTimeout(resolve, delay));
+    delay = Math.min(delay * 2, 5000);
+    job = await api(`/api/report/jobs/${job.job_id}`);
+  }
+  if(!job || job.status !== 'done'){ alert('Report generation failed'); return; }
+  window.location.href = job.download_url;
 }
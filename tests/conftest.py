@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# app.py reads DATA_DIR when first imported, so every test module shares one app and database.
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("data")
+    os.environ["DATA_DIR"] = str(data_dir)
+    os.environ["REPORTS_DIR"] = str(data_dir / "reports")
+    from app import create_app
+    import migrations
+    app = create_app()
+    with app.app_context():
+        migrations.ensure_schema()
+    return app
@@ -0,0 +1,74 @@
+from datetime import date, time, timedelta
+
+
+def seed(year):
+    """A household of three with expenses in `year` and in the current year; returns (hid, user_ids)."""
+    from extensions import db
+    from models import User, Household, Expense, Split
+    import aggregates
+    import analytics
+    household = Household(name="archive")
+    db.session.add(household)
+    db.session.flush()
+    users = [User(email=f"a{i}.{household.id}@test", display_name=f"A{i}", household_id=household.id,
+                  is_admin=i == 0) for i in range(3)]
+    db.session.add_all(users)
+    db.session.flush()
+    for i, day in enumerate([date(year, 1, 1) + timedelta(days=7 * n) for n in range(30)] +
+                            [date(date.today().year, 1, 1) + timedelta(days=n) for n in range(10)]):
+        payer = users[i % 3]
+        e = Expense(item=f"groceries {i}", amount=10 + i % 5, payer_id=payer.id, household_id=household.id,
+                    category="food" if i % 2 else None, date=day, time=time(i % 24, i % 60))
+        db.session.add(e)
+        db.session.flush()
+        for u in (users[i % 3], users[(i + 1) % 3]):
+            db.session.add(Split(expense_id=e.id, user_id=u.id, share_amount=e.amount / 2))
+    db.session.commit()
+    aggregates.rebuild(household.id)
+    analytics.rebuild(household.id)
+    return household.id, [u.id for u in users]
+
+def snapshot(household_id):
+    """Rollup/index problems, net balances and the full CSV report for the household."""
+    import aggregates
+    import analytics
+    import reports
+    import search
+    import settlement
+    problems = aggregates.verify(household_id) + analytics.verify(household_id) + search.verify()
+    csv = "".join(reports.iter_csv(household_id, *reports.period_window("full")))
+    return problems, settlement.net_balances(household_id), csv
+
+def transfer(household_id, from_user_id, to_user_id):
+    # what POST /api/user/<from>/transfer/<to> does
+    from extensions import db
+    import admin_ops
+    import versions
+    admin_ops.transfer_member(household_id, from_user_id, to_user_id)
+    admin_ops.deactivate_members(household_id, [from_user_id])
+    versions.bump(household_id)
+    db.session.commit()
+
+
+def test_transfer_while_archived_survives_restore(app):
+    import archive
+    from models import ArchivedPeriod, Expense
+    year = date.today().year - 2
+    with app.app_context():
+        hid, (a, b, c) = seed(year)
+        problems, balances, csv = snapshot(hid)
+        assert problems == []
+
+        assert archive.archive_year(hid, year) == 30
+        assert snapshot(hid) == ([], balances, csv)
+
+        transfer(hid, b, a)
+        problems, transferred, csv = snapshot(hid)
+        assert problems == []
+        assert transferred == {a: balances[a] + balances[b], c: balances[c]}
+        assert "A1" not in csv
+
+        assert archive.restore_year(hid, year) == 30
+        assert snapshot(hid) == ([], transferred, csv)
+        assert ArchivedPeriod.query.filter_by(household_id=hid).count() == 0
+        assert Expense.query.filter_by(household_id=hid, payer_id=b).count() == 0
@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import insert, text
+
+
+@pytest.fixture(scope="module")
+def households(app):
+    """Many small households, so that after ANALYZE the planner sees the selectivity production has."""
+    from extensions import db
+    from models import User, Household, Expense, Split
+    with app.app_context():
+        hids = db.session.scalars(insert(Household).returning(Household.id, sort_by_parameter_order=True),
+                                  [{"name": f"m{i}"} for i in range(100)]).all()
+        users = [{"email": f"m{i}.{hid}@test", "household_id": hid} for hid in hids for i in range(4)]
+        uids = db.session.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), users).all()
+        rows = [{"item": f"item {n}", "amount": 10.0, "payer_id": uids[4 * i + n % 4], "household_id": hid,
+                 "date": date(2024, 1, 1) + timedelta(days=n)} for i, hid in enumerate(hids) for n in range(20)]
+        eids = db.session.scalars(insert(Expense).returning(Expense.id, sort_by_parameter_order=True), rows).all()
+        db.session.execute(insert(Split), [{"expense_id": eid, "user_id": r["payer_id"], "share_amount": 10.0}
+                                           for eid, r in zip(eids, rows)])
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+
+def index_names(conn):
+    return {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+
+
+def test_hot_queries_use_their_indexes(app, households):
+    import migrations
+    with app.app_context():
+        plans = migrations.explain_hot_queries()
+    assert len(plans) == len(migrations.HOT_QUERIES)
+    assert [(name, plan) for name, _, plan, ok in plans if not ok] == []
+
+def test_upgrade_adds_indexes_to_an_older_database(app, households):
+    import migrations
+    from extensions import db
+    version, _, statements = migrations.MIGRATIONS[0]
+    indexes = [sql.split()[5] for sql in statements if sql.startswith("CREATE INDEX")]
+    with app.app_context():
+        # a database from before migration 1: no hot path indexes and no record of the migration
+        with db.engine.begin() as conn:
+            for name in indexes:
+                conn.execute(text(f"DROP INDEX {name}"))
+            conn.execute(text("DELETE FROM schema_migration WHERE version = :v"), {"v": version})
+            assert not index_names(conn) & set(indexes)
+
+        assert migrations.upgrade() == [version]
+        with db.engine.connect() as conn:
+            assert set(indexes) <= index_names(conn)
+        assert all(ok for _, _, _, ok in migrations.explain_hot_queries())
+        assert migrations.upgrade() == []
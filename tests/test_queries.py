@@ -0,0 +1,47 @@
+from datetime import date, time, timedelta
+
+from sqlalchemy import event
+
+
+def seed(n, members=3):
+    from extensions import db
+    from models import User, Household, Expense, Split
+    household = Household(name=f"h{n}")
+    db.session.add(household)
+    db.session.flush()
+    users = [User(email=f"u{i}.{household.id}@test", display_name=f"U{i}", household_id=household.id)
+             for i in range(members)]
+    db.session.add_all(users)
+    db.session.flush()
+    for i in range(n):
+        payer = users[i % members]
+        e = Expense(item=f"item {i}", amount=10 + i % 7, payer_id=payer.id, household_id=household.id,
+                    date=date(2025, 1, 1) + timedelta(days=i % 300), time=time(i % 24, i % 60))
+        db.session.add(e)
+        db.session.flush()
+        for u in users[:2]:
+            db.session.add(Split(expense_id=e.id, user_id=u.id, share_amount=e.amount / 2))
+    db.session.commit()
+    return household.id
+
+def count_queries(household_id):
+    from extensions import db
+    from models import Expense
+    from queries import load_expenses
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        expenses, _, _ = load_expenses(Expense.query.filter_by(household_id=household_id))
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    return len(expenses), len(statements)
+
+
+def test_load_expenses_query_count_is_constant(app):
+    with app.app_context():
+        small, large = seed(20), seed(200)
+        rows_small, queries_small = count_queries(small)
+        rows_large, queries_large = count_queries(large)
+    assert (rows_small, rows_large) == (20, 200)
+    assert queries_small == queries_large == 3
@@ -0,0 +1,57 @@
+# versions.py
+# Per-household data version. Every write path calls bump() before committing; caches key on
+# current(), and read APIs use it as an HTTP validator (ETag) via conditional.
+import functools
+import hashlib
+from datetime import datetime
+from flask import make_response, request
+from flask_login import current_user
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db
+from models import HouseholdVersion
+
+
+def bump(household_id):
+    """Increment the household's data version as part of the current transaction."""
+    if not household_id:
+        return
+    now = datetime.utcnow()
+    stmt = sqlite_insert(HouseholdVersion).values(household_id=household_id, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(index_elements=["household_id"],
+                                      set_={"version": HouseholdVersion.version + 1, "updated_at": now})
+    db.session.execute(stmt)
+
+def current(household_id):
+    row = db.session.query(HouseholdVersion.version).filter_by(household_id=household_id).first()
+    return row[0] if row else 0
+
+
+# ---------- conditional GET ----------
+def _etag(household_id, version):
+    # responses also depend on the query string (date ranges, cursors, formats)
+    args = hashlib.sha1(request.query_string).hexdigest()[:12]
+    return f"hh{household_id}-v{version}-{request.endpoint}-{args}"
+
+def conditional(fn):
+    """Serve a household read API with an ETag from the data version.
+
+    A matching If-None-Match gets a 304 before the handler runs, so none of its queries execute.
+    The ETag is the only validator: Last-Modified has whole-second resolution and cannot tell
+    apart two writes within the same second.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        household_id = current_user.household_id if current_user.is_authenticated else None
+        if not household_id or request.method != "GET":
+            return fn(*args, **kwargs)
+        etag = _etag(household_id, current(household_id))
+        if request.if_none_match.contains(etag):
+            resp = make_response("", 304)
+        else:
+            resp = make_response(fn(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+    return wrapper